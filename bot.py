@@ -1,5 +1,6 @@
 """Overriding commands.Bot"""
 
+import asyncio
 import discord
 import logging
 
@@ -7,7 +8,11 @@ from typing import *
 from discord.ext import commands
 
 from utils.config import DockerConfig
-from utils.database import TwUtilsDB
+from utils.database import AsyncTwUtilsDB, DBCONFIG
+from cogs.apis.twutils import TwUtilsAPI
+from utils.scheduler import RenderScheduler
+from utils.render_cache import RenderCache
+from utils.executor import ImageExecutor
 
 log = logging.getLogger(__name__)
 config = DockerConfig("config.ini")
@@ -16,10 +21,11 @@ EXTENSIONS = (
     "cogs.asset",
     "cogs.renderer",
     "cogs.scene",
+    "cogs.storage",
 )
 
 commands.MinimalHelpCommand()
-class Bot(commands.Bot, TwUtilsDB):
+class Bot(commands.Bot):
     """
         Primary class that contains the bot object to run
     """
@@ -30,15 +36,64 @@ class Bot(commands.Bot, TwUtilsDB):
         self._get_options()
         super().__init__(**self.bot_options)
 
-        # Init MongoDB database, colections and apply schemas
-        self.conn = TwUtilsDB()
+        # Process pool for the image work (0 workers: one per core)
+        self.image_executor = ImageExecutor(
+            int(config.get_var("IMAGE_EXECUTOR", "WORKERS") or 0)
+        )
+
+        # One MongoDB connection pool shared by the cogs
+        self.conn = AsyncTwUtilsDB()
+
+        # Init colections and apply schemas
+        if DBCONFIG["init_schema"]:
+            self.conn.db.init_collections()
+            log.info("Database schemas and indexes initialized")
+
+        # Shared tw-utils API client (one keep-alive connection pool)
+        self.twutils = TwUtilsAPI()
+
+        # Skin renders go through the API or the in process renderer
+        self.render_engine = self.twutils
+
+        if config.get_var("TW_UTILS", "RENDER_ENGINE") == "local":
+            from cogs.apis.teerender import TeeRenderer, has_references
+
+            # Only once it has been checked against the API renders
+            if has_references():
+                self.render_engine = TeeRenderer(self.twutils, self.image_executor)
+            else:
+                log.warning(
+                    "RENDER_ENGINE = local ignored, record the reference "
+                    "renders and run tools.bench_render first"
+                )
+
+        # Renders and scenes cache (sizes in MiB)
+        self.render_cache = RenderCache(
+            config.get_var("RENDER_CACHE", "PATH"),
+            int(config.get_var("RENDER_CACHE", "MEMORY_SIZE") or 32) * 1024 * 1024,
+            int(config.get_var("RENDER_CACHE", "DISK_SIZE") or 512) * 1024 * 1024
+        )
+
+        # Bounds the render and scene jobs sent to the API
+        self.scheduler = RenderScheduler(
+            int(config.get_var("RENDER_SCHEDULER", "CONCURRENCY") or 4),
+            int(config.get_var("RENDER_SCHEDULER", "MAX_QUEUE") or 32),
+            int(config.get_var("RENDER_SCHEDULER", "MAX_GUILD_QUEUE") or 8)
+        )
+
+        # discord.py 2.0 loads the extensions in setup_hook
+        if discord.version_info.major < 2:
+            for extension in EXTENSIONS:
+                # try:
+                self.load_extension(extension)
+                log.info(f"Loaded the extension {extension}")
+                # except:
+                    # log.warning(f"Failed to load the extension {extension}")
 
+    async def setup_hook(self):
         for extension in EXTENSIONS:
-            # try:
-            self.load_extension(extension)
+            await self.load_extension(extension)
             log.info(f"Loaded the extension {extension}")
-            # except:
-                # log.warning(f"Failed to load the extension {extension}")
 
     def _get_options(self):
         for k, v in config.items("BOT"):
@@ -52,7 +107,13 @@ class Bot(commands.Bot, TwUtilsDB):
 
     async def close(self):
         log.critical("Closing")
-        await self.close()
+        await self.twutils.close()
+
+        # Waits for the running jobs without blocking the loop
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.image_executor.shutdown)
+
+        await super().close()
 
     async def on_command(self, ctx: commands.Context):
         dest = [f"#{ctx.channel} ({ctx.guild})", "DM"][not ctx.guild]
@@ -61,7 +122,7 @@ class Bot(commands.Bot, TwUtilsDB):
     async def on_guild_join(self, guild: discord.Guild):
         log.warning(f"{self.user} (ID: {self.user.id}) has joined {guild.name} (ID: {guild.id})")
 
-        self.conn.add_guild(
+        await self.conn.add_guild(
             {
                 "guildID": str(guild.id)
             }
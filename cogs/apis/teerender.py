@@ -0,0 +1,284 @@
+"""local tee render module"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import colorsys
+import numpy as np
+
+from PIL import Image
+from typing import Tuple, Union
+
+from cogs.data.asset import ASSET_TYPE
+
+log = logging.getLogger(__name__)
+
+# Sprites position on the skin grid (x, y, w, h), in grid units
+SKIN_GRID = ASSET_TYPE["skin"]["divisor"]
+# The hands are only drawn with a weapon, not on an idle tee
+SKIN_PARTS = {
+    "body": (0, 0, 3, 3),
+    "body_shadow": (3, 0, 3, 3),
+    "foot": (6, 1, 2, 1),
+    "foot_shadow": (6, 2, 2, 1)
+}
+EYES = {
+    "default_eye": (2, 3, 1, 1),
+    "angry_eye": (3, 3, 1, 1),
+    "pain_eye": (4, 3, 1, 1),
+    "happy_eye": (5, 3, 1, 1),
+    "dead_eye": (6, 3, 1, 1),
+    "surprise_eye": (7, 3, 1, 1)
+}
+
+# Teeworlds body grayscale reorder target
+BODY_WEIGHT = 192
+
+# Look direction of the rendered tee (right)
+DIRECTION = (1, 0)
+
+# Parity cases and the API renders they are checked against
+REFERENCE_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "..", "..", "tools", "render_reference"
+)
+
+def has_references() -> bool:
+    """
+        Checks if the API reference render of every parity case
+        has been recorded (tools.bench_render --record)
+    """
+
+    try:
+        with open(os.path.join(REFERENCE_PATH, "cases.json")) as f:
+            cases = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    return all(
+        os.path.exists(os.path.join(REFERENCE_PATH, "renders", case["name"] + ".png"))
+        for case in cases
+    )
+
+def parse_color(color: str, mode: str) -> Tuple[float, float, float]:
+    """
+        Returns a RGB color (0 - 1) from a rgb ("r,g,b"),
+        hsl ("h,s,l" in degrees and percents) or code (Teeworlds) color
+    """
+
+    if mode == "code":
+        code = int(color)
+        h, s, l = (code >> 16) & 0xff, (code >> 8) & 0xff, code & 0xff
+
+        # Teeworlds never goes under 50% lightness
+        return colorsys.hls_to_rgb(h / 255, 0.5 + l / 255 * 0.5, s / 255)
+
+    values = [float(v) for v in color.split(",")]
+
+    if len(values) != 3:
+        raise ValueError(f"Wrong color {color}")
+
+    if mode == "rgb":
+        return tuple(min(max(v / 255, 0), 1) for v in values)
+    if mode == "hsl":
+        h, s, l = values
+        return colorsys.hls_to_rgb(h / 360, l / 100, s / 100)
+
+    raise ValueError(f"Wrong color mode {mode}")
+
+def tint(sprite: np.ndarray, color: Tuple[float, float, float], reorder: bool=False) -> np.ndarray:
+    """
+        Grayscales a RGBA sprite and multiplies it by color,
+        the body also gets the Teeworlds lightness reorder
+    """
+
+    gray = sprite[..., :3].astype(np.float32).sum(axis=-1) / 3
+    gray = np.floor(gray)
+
+    if reorder:
+        visible = sprite[..., 3] > 128
+        freq = np.bincount(gray[visible].astype(np.int64), minlength=256)
+        org = min(max(int(np.argmax(freq)), 1), 254)
+
+        gray = np.where(
+            gray <= org,
+            gray / org * BODY_WEIGHT,
+            (gray - org) / (255 - org) * (255 - BODY_WEIGHT) + BODY_WEIGHT
+        )
+
+    ret = np.empty(sprite.shape, dtype=np.uint8)
+    ret[..., :3] = np.clip(
+        gray[..., None] * np.asarray(color, dtype=np.float32),
+        0,
+        255
+    ).astype(np.uint8)
+    ret[..., 3] = sprite[..., 3]
+
+    return ret
+
+def crop(skin: np.ndarray, part: Tuple[int, int, int, int]) -> np.ndarray:
+    """
+        Returns a sprite from the skin grid
+        (the grid unit scales with HD skins)
+    """
+
+    unit_w = skin.shape[1] // SKIN_GRID["w"]
+    unit_h = skin.shape[0] // SKIN_GRID["h"]
+    x, y, w, h = part
+
+    return skin[y * unit_h:(y + h) * unit_h, x * unit_w:(x + w) * unit_w]
+
+def render_tee(
+    skin: Union[bytes, str],
+    eye: str="default_eye",
+    body_color: Tuple[float, float, float]=None,
+    feet_color: Tuple[float, float, float]=None
+) -> bytes:
+    """
+        Renders an idle tee looking right, the same way
+        the Teeworlds client does, and returns a PNG
+
+        The skin is its content or its storage path
+    """
+
+    if isinstance(skin, bytes):
+        skin = io.BytesIO(skin)
+
+    img = Image.open(skin).convert("RGBA")
+    sheet = np.asarray(img)
+
+    if img.width % SKIN_GRID["w"] or img.height % SKIN_GRID["h"]:
+        raise ValueError("Wrong skin size")
+
+    sprites = {name: crop(sheet, part) for name, part in SKIN_PARTS.items()}
+    sprites["eye"] = crop(sheet, EYES[eye])
+
+    if body_color:
+        for name in ("body", "body_shadow", "eye"):
+            sprites[name] = tint(sprites[name], body_color, name == "body")
+    if feet_color:
+        for name in ("foot", "foot_shadow"):
+            sprites[name] = tint(sprites[name], feet_color)
+
+    # The body is drawn at its native resolution
+    base = sprites["body"].shape[1]
+    scale = base / 64
+
+    width = int(np.ceil(base + 14 * scale))
+    height = int(np.ceil(base * 0.75 + 14 * scale))
+    origin = (width / 2, base / 2 + 4 * scale)
+    canvas = Image.new("RGBA", (width, height))
+
+    def draw(name: str, x: float, y: float, w: float, h: float, flip: bool=False):
+        sprite = Image.fromarray(sprites[name]).resize(
+            (max(round(w), 1), max(round(h), 1)),
+            Image.LANCZOS
+        )
+
+        if flip:
+            sprite = sprite.transpose(Image.FLIP_LEFT_RIGHT)
+
+        left = max(round(origin[0] + x - w / 2), 0)
+        top = max(round(origin[1] + y - h / 2), 0)
+        canvas.alpha_composite(sprite, (left, top))
+
+    body = (0, -4 * scale, base, base)
+    back_foot = (-7 * scale, 10 * scale, base, base / 2)
+    front_foot = (7 * scale, 10 * scale, base, base / 2)
+
+    # Same as CRenderTools::RenderTee of the client
+    dx, dy = DIRECTION
+    eye_size = base * 0.4
+    eye_x = body[0] + dx * 0.125 * base
+    eye_y = body[1] + (-0.05 + dy * 0.10) * base
+    eye_sep = (0.075 - 0.010 * abs(dx)) * base
+
+    draw("foot_shadow", *back_foot)
+    draw("body_shadow", *body)
+    draw("foot_shadow", *front_foot)
+    draw("foot", *back_foot)
+    draw("body", *body)
+    draw("eye", eye_x - eye_sep, eye_y, eye_size, eye_size)
+    draw("eye", eye_x + eye_sep, eye_y, eye_size, eye_size, flip=True)
+    draw("foot", *front_foot)
+
+    ret = io.BytesIO()
+    canvas.save(ret, format="PNG")
+
+    return ret.getvalue()
+
+class TeeRenderer:
+    """
+        In process alternative to the tw-utils API render routes,
+        it has the same surface as TwUtilsAPI.render and render_color
+
+        The renders run in the image executor if one is given
+    """
+
+    def __init__(self, api: object, executor: object=None):
+        self.api = api
+        self.executor = executor
+
+    async def load(self, skin: str) -> Union[bytes, str, None]:
+        """
+            Returns the skin content from an URL, a storage path is
+            returned as is, the file is read with the render
+        """
+
+        if not skin.startswith("http"):
+            return skin
+
+        try:
+            async with self.api.get_session().get(skin) as req:
+                if req.status != 200:
+                    return None
+
+                return await req.read()
+        except Exception as error:
+            log.warning(f"Unable to load the skin {skin}: {error!r}")
+            return None
+
+    async def run(self, data: json, *args: list) -> Union[bytes, None]:
+        """
+            Loads the skin and renders it outside of the event loop
+            (a stored skin is also read there)
+        """
+
+        skin = await self.load(data["skin"])
+
+        if not skin:
+            return None
+
+        loop = asyncio.get_event_loop()
+        args = (skin, data.get("eye") or "default_eye", *args)
+
+        try:
+            if self.executor:
+                return await self.executor.run(render_tee, *args)
+
+            return await loop.run_in_executor(None, render_tee, *args)
+        except Exception as error:
+            log.info(f"Local render failed for {data}: {error!r}")
+            return None
+
+    async def render(self, data: json) -> Union[bytes, None]:
+        """
+            Returns a rendered Teeworlds skin
+        """
+
+        return await self.run(data)
+
+    async def render_color(self, data: json) -> Union[bytes, None]:
+        """
+            Returns a rendered Teeworlds skin with colors
+        """
+
+        try:
+            body_color = parse_color(data["bcolor"], data["mode"])
+            feet_color = parse_color(data["fcolor"], data["mode"])
+        except (KeyError, ValueError):
+            return None
+
+        return await self.run(data, body_color, feet_color)
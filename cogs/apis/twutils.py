@@ -1,97 +1,121 @@
 """tw-utils requests module"""
 
-import requests
+import aiohttp
 import json
+import logging
 
 from utils.config import DockerConfig
+from utils.singleflight import SingleFlight
 from typing import Union, List
 
+log = logging.getLogger(__name__)
 config = DockerConfig("config.ini")
 
 class TwUtilsAPI:
     """
         Class used to manage request with the tw-utils  API
+
+        Every request goes through one shared aiohttp session,
+        so the TCP connections to the API are kept alive and reused
+
+        Concurrent identical requests are coalesced into one
     """
 
     HOST = config.get_var("TW_UTILS", "HOST")
     PORT = config.get_var("TW_UTILS", "PORT")
     HOST = HOST + ":" + PORT
 
-    def request(_type: callable, *args, **kwargs) -> object:
+    POOL_SIZE = int(config.get_var("TW_UTILS", "POOL_SIZE") or 16)
+    TIMEOUT = float(config.get_var("TW_UTILS", "TIMEOUT") or 30)
+
+    def __init__(self):
+        self.session = None
+        self.in_flight = SingleFlight()
+
+    def get_session(self) -> aiohttp.ClientSession:
         """
-            tw-utils HTTP request
+            Returns the shared session, it is created on first use
+            because aiohttp needs a running event loop
         """
 
-        try:
-            req = _type(*args, **kwargs)
+        if not self.session or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.POOL_SIZE,
+                keepalive_timeout=60
+            )
 
-            if req.status_code != 200:
-                return None
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.TIMEOUT)
+            )
 
-            return req
-        except:
-            return None
+        return self.session
+
+    async def close(self):
+        """
+            Closes the shared session and its connection pool
+        """
+
+        if self.session and not self.session.closed:
+            await self.session.close()
 
-    def common_request(func: callable, route: str, data: json) -> Union[bytes, None]:
+    async def request(self, route: str, data: json=None) -> Union[bytes, None]:
         """
-            Common tw-utils HTTP request
+            tw-utils HTTP request, shared with the identical
+            requests already in flight
         """
 
-        req = TwUtilsAPI.request(
-            func,
-            url=TwUtilsAPI.HOST + route,
-            json=data
-        )
+        key = route + json.dumps(data, sort_keys=True)
+
+        return await self.in_flight.do(key, self._request, route, data)
 
-        if not req:
+    async def _request(self, route: str, data: json=None) -> Union[bytes, None]:
+        """
+            tw-utils HTTP request
+        """
+
+        try:
+            async with self.get_session().get(
+                self.HOST + route,
+                json=data
+            ) as req:
+                if req.status != 200:
+                    return None
+
+                return await req.read()
+        except Exception as error:
+            log.warning(f"tw-utils request {route} failed: {error!r}")
             return None
 
-        return req.content
-    
-    def render(data: json) -> Union[bytes, None]:
+    async def render(self, data: json) -> Union[bytes, None]:
         """
             Returns a rendered Teeworlds skin
         """
 
-        return TwUtilsAPI.common_request(
-            requests.get,
-            "/render",
-            data
-        )
+        return await self.request("/render", data)
 
-    def render_color(data: json) -> Union[bytes, None]:
+    async def render_color(self, data: json) -> Union[bytes, None]:
         """
             Returns a rendered Teeworlds skin with colors
         """
 
-        return TwUtilsAPI.common_request(
-            requests.get,
-            "/renderColor",
-            data
-        )
+        return await self.request("/renderColor", data)
 
-    def scene(data: json) -> Union[bytes, None]:
+    async def scene(self, data: json) -> Union[bytes, None]:
         """
             Returns a Teeskins scene
         """
 
-        return TwUtilsAPI.common_request(
-            requests.get,
-            "/scene",
-            data
-        )
-    
-    def scene_list() -> Union[List[str], None]:
+        return await self.request("/scene", data)
+
+    async def scene_list(self) -> Union[List[str], None]:
         """
             Returns a list of the available scenes
         """
 
-        req = TwUtilsAPI.request(
-            requests.get,
-            url=TwUtilsAPI.HOST + "/sceneList"
-        )
+        content = await self.request("/sceneList")
 
-        if not req:
+        if not content:
             return None
 
-        return req.json()
+        return json.loads(content)
@@ -1,52 +1,78 @@
 """upload cog"""
 
-import hashlib
-import uuid
-import requests
 import discord
-import io
-import os
+import functools
 
 from discord.ext import commands
-from typing import Dict
-from PIL import Image
+from typing import Dict, List, Tuple
 from datetime import datetime
 
 from utils.config import DockerConfig
+from utils.database import listing_key
 from utils.utilities import (
     basic_message,
-    create_asset_pages,
-    signature_check,
+    format_assets,
 )
-from utils.database import TwUtilsDB
-from utils.cache import Cache
 from cogs.data.asset import (
     ASSET_TYPE,
     WRONG_ERROR_MSG,
-    NOT_FOUND_ERROR_MSG,
-    is_asset_valid
+    NOT_FOUND_ERROR_MSG
 )
 from utils.page import Pages
+from utils.ephemeral import create_store, MemoryStore
+from utils.hashindex import HashIndex
+from utils.image import image_hashes
+from utils.ingest import Ingest, IngestError
+from utils.sender import BatchSender
+from utils.storage import (
+    asset_path,
+    preview_path,
+    create_preview,
+    write_asset,
+    remove_asset
+)
 
 config = DockerConfig("config.ini")
 unique_key = lambda ctx: str(ctx.guild.id) + str(ctx.author.id)
 
-STORAGE_PATH = config.get_var("STORAGE", "PATH")
+# Bigger attachments are rejected before being downloaded (bytes)
+MAX_UPLOAD_BYTES = int(config.get_var("STORAGE", "MAX_UPLOAD_BYTES") or 8 * 1024 * 1024)
+
+UPLOADS_TTL = int(config.get_var("EPHEMERAL", "UPLOADS_TTL") or 900)
+UPLOADS_MAX = int(config.get_var("EPHEMERAL", "UPLOADS_MAX") or 1000)
+
+USER_NAMES_TTL = int(config.get_var("EPHEMERAL", "USER_NAMES_TTL") or 3600)
+USER_NAMES_MAX = int(config.get_var("EPHEMERAL", "USER_NAMES_MAX") or 5000)
+
+# Perceptual hash distance (bits) under which an upload is a near duplicate
+PHASH_DISTANCE = int(config.get_var("DUPLICATES", "PHASH_DISTANCE") or 4)
+
+# Loaded guild hash indexes, rebuilt from the database once expired
+PHASH_INDEX_TTL = 3600
+PHASH_INDEX_MAX = 100
+
+# Assets per bulk accept / remove command
+BULK_MAX = 100
+
+# Assets per listing page (+ the header line)
+LISTING_PAGE_SIZE = 9
 
 class UserPreUpload:
     """
         Represents upload informations before its uploaded (only PNGs)
+
+        It only holds plain data, so it can be kept in Redis
     """
 
     def __init__(
         self,
         ctx: commands.Context,
-        bot_msg: commands.Context,
+        bot_msg: discord.Message,
         **data: Dict[str, str]
         ):
 
-        self.ctx = ctx
-        self.bot_msg = bot_msg
+        self.channel_id = ctx.channel.id
+        self.bot_msg_id = bot_msg.id
         self.data = data or {}
     
     def __getitem__(self, __name: str) -> str:
@@ -73,6 +99,16 @@ class UserPreUpload:
 
         return ret
     
+    async def delete_bot_msg(self, bot: commands.Bot):
+        """
+            Deletes the bot message asking for the attachment
+        """
+
+        channel = bot.get_channel(self.channel_id)
+
+        if channel:
+            await channel.get_partial_message(self.bot_msg_id).delete()
+
     def fill_data(self, **extra_data: Dict[str, str]):
         """
             Fills the class data attr after the user uploaded the image
@@ -89,16 +125,18 @@ class UserPreUploads:
     """
 
     def __init__(self):
-        self.pre_uploads = {}
+        # Abandoned uploads expire with the store rules
+        self.pre_uploads = create_store("pre_uploads", UPLOADS_TTL, UPLOADS_MAX)
 
-    def __getitem__(self, key: str) -> UserPreUpload:
-        if not key in self.pre_uploads.keys():
-            return None
-        
-        return self.pre_uploads[key]
+    async def get(self, key: str) -> UserPreUpload:
+        """
+            Returns the user upload in progress or None
+        """
 
-    def add(self, ctx: commands.Context,
-        bot_msg: commands.Context,
+        return await self.pre_uploads.get(key)
+
+    async def add(self, ctx: commands.Context,
+        bot_msg: discord.Message,
         **data: Dict[str, str]
         ) -> bool:
         """
@@ -107,19 +145,127 @@ class UserPreUploads:
 
         key = unique_key(ctx)
 
-        if self[key]:
+        if await self.get(key):
             return False
 
-        self.pre_uploads[key] = UserPreUpload(ctx, bot_msg, **data)
+        await self.pre_uploads.set(key, UserPreUpload(ctx, bot_msg, **data))
 
         return True
     
-    def remove(self, key: str):
+    async def remove(self, key: str):
         """
             Removes an UserPreUpload from self.pre_uploads
         """
 
-        del self.pre_uploads[key]
+        await self.pre_uploads.delete(key)
+
+class NearDuplicates:
+    """
+        Per guild perceptual hash indexes, loaded from the database
+        on first use and kept up to date with the uploads and removals
+
+        The asset ids are stored as lowercase strings, the form
+        of str(ObjectId), whatever the caller passes
+    """
+
+    def __init__(self, db_conn: object):
+        self.db_conn = db_conn
+        self.indexes = MemoryStore(PHASH_INDEX_TTL, PHASH_INDEX_MAX)
+
+    async def get(self, guild_id: str) -> HashIndex:
+        """
+            Returns the guild index, loading it if needed
+        """
+
+        index = self.indexes.get(guild_id)
+
+        if index is None:
+            index = HashIndex(radius=PHASH_DISTANCE)
+
+            for doc in await self.db_conn.get_phashes(guild_id):
+                index.add(int(doc["phash"], 16), str(doc["_id"]))
+
+            self.indexes.set(guild_id, index)
+
+        return index
+
+    async def search(self, guild_id: str, phash: str) -> List[Tuple[int, str]]:
+        """
+            Returns the (distance, asset id) pairs looking like phash
+        """
+
+        index = await self.get(guild_id)
+
+        return index.search(int(phash, 16))
+
+    def add(self, guild_id: str, phash: str, _id: str):
+        """
+            Adds an asset to the guild index if it is loaded
+        """
+
+        index = self.indexes.get(guild_id)
+
+        if index is not None:
+            index.add(int(phash, 16), str(_id).lower())
+
+    def remove(self, guild_id: str, phash: str, _id: str):
+        """
+            Removes an asset from the guild index if it is loaded
+        """
+
+        index = self.indexes.get(guild_id)
+
+        if index is not None:
+            index.remove(int(phash, 16), str(_id).lower())
+
+class UserNames:
+    """
+        Bounded TTL cache of the user names displayed in the asset views,
+        a name comes from the member cache, then from the name captured at
+        upload and only then from the Discord API
+    """
+
+    UNKNOWN_USER = "an unknown user"
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.names = MemoryStore(USER_NAMES_TTL, USER_NAMES_MAX)
+
+    def set(self, user_id: str, name: str):
+        self.names.set(str(user_id), name)
+
+    async def get(
+        self,
+        user_id: str,
+        guild: discord.Guild=None,
+        fallback: str=None
+    ) -> str:
+        """
+            Returns the user name
+        """
+
+        name = self.names.get(str(user_id))
+
+        if name:
+            return name
+
+        user = guild and guild.get_member(int(user_id))
+        user = user or self.bot.get_user(int(user_id))
+
+        if user:
+            name = str(user)
+        elif fallback:
+            name = fallback
+        else:
+            try:
+                name = str(await self.bot.fetch_user(int(user_id)))
+            except discord.HTTPException:
+                # Cached too, a deleted account would be fetched every time
+                name = self.UNKNOWN_USER
+
+        self.set(user_id, name)
+
+        return name
 
 class Asset(commands.Cog, Pages):
     """
@@ -130,12 +276,18 @@ class Asset(commands.Cog, Pages):
 
     def __init__(self, bot: commands.Bot) -> None:
         self.users_pre_upload = UserPreUploads()
-        self.db_conn = TwUtilsDB()
-        self.cache = Cache()
-        Pages.__init__(self)
+        self.db_conn = bot.conn
+        self.ingest = Ingest(MAX_UPLOAD_BYTES)
+        self.near_duplicates = NearDuplicates(self.db_conn)
+        self.user_names = UserNames(bot)
+        self.sender = BatchSender()
+        Pages.__init__(self, "asset_pages", bot)
 
         self.bot = bot
 
+    def cog_unload(self):
+        self.bot.loop.create_task(self.ingest.close())
+
     async def upload_asset(
         self,
         key: str,
@@ -154,17 +306,40 @@ class Asset(commands.Cog, Pages):
             "type": pre_upload["type"],
             "path": pre_upload["path"],
             "checksum": pre_upload["checksum"],
+            "pixelHash": pre_upload["pixelHash"],
+            "phash": pre_upload["phash"],
             "guildID": str(message.guild.id),
             "authorID": str(message.author.id),
             "authorName": pre_upload["author"],
+            "uploaderName": str(message.author),
             "createdAt": datetime.now(),
             "accepted": False
         }
 
-        res = self.db_conn.add_to_queue(fields)
+        # Save the bytes (asset content) as file before the document,
+        # shared by every guild with the same checksum. If the insert
+        # fails, the scrubber deletes the unused file
+        await self.bot.loop.run_in_executor(
+            None,
+            write_asset,
+            fields["path"],
+            asset.content
+        )
+
+        # Generated once, the views send the recorded path
+        fields["previewPath"] = await self.bot.image_executor.run(
+            create_preview,
+            fields["checksum"],
+            fields["path"],
+            asset.content
+        )
+
+        res = await self.db_conn.add_to_queue(fields)
+
+        self.user_names.set(fields["authorID"], fields["uploaderName"])
 
         await message.delete()
-        await pre_upload.bot_msg.delete()
+        await pre_upload.delete_bot_msg(self.bot)
 
         # Check if the document has been inserted to the collection
         if not res:
@@ -179,12 +354,13 @@ class Asset(commands.Cog, Pages):
             f"id: {res.inserted_id}"
         )
 
-         # Save the bytes (asset content) as file
-        if not os.path.exists(fields["path"]):
-            with open(fields["path"], "wb") as f:
-                f.write(asset.content)
+        self.near_duplicates.add(
+            fields["guildID"],
+            fields["phash"],
+            str(res.inserted_id)
+        )
 
-        self.users_pre_upload.remove(key)
+        await self.users_pre_upload.remove(key)
 
     async def upload_handler(self, message: object):
         """
@@ -198,60 +374,73 @@ class Asset(commands.Cog, Pages):
             return
         
         key = unique_key(message)
-        pre_upload = self.users_pre_upload[key]
+        pre_upload = await self.users_pre_upload.get(key)
 
         if message.author.bot or not pre_upload:
             return
 
-        if not pre_upload.ctx.channel.id == message.channel.id:
+        if not pre_upload.channel_id == message.channel.id:
             return
 
-        # 2. Download the asset and check if its a PNG
-        asset = requests.get(attachs[0])
-        if not signature_check(
-            asset.content,
-            b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a"
-        ):
+        # 2. Stream the asset, checking its size, signature and dimensions
+        try:
+            asset = await self.ingest.fetch(attachs[0], pre_upload["type"])
+        except IngestError as error:
+            return await basic_message(message.channel, str(error))
+
+        # 3. Checksum computed while downloading
+        checksum = asset.checksum
+
+        # 4. Check if it already exists in the same guild
+        duplicate = await self.db_conn.duplicate(
+            checksum, str(message.guild.id)
+        )
+
+        if duplicate:
             return await basic_message(
                 message.channel,
-                "❌ Only PNGs are supported"
+                f"❌ This asset has already been added to the queue",
+                self.CANCEL_MSG
             )
         
-        # 3 Check the size
-        img = Image.open(io.BytesIO(asset.content))
-        if not is_asset_valid(pre_upload.data["type"], img):
+        # 5. Check if the same pixels or a look-alike exist in the guild
+        try:
+            pixel_hash, phash = await self.bot.image_executor.run(
+                image_hashes,
+                asset.content
+            )
+        except Exception:
             return await basic_message(
                 message.channel,
                 "❌ Invalid asset"
             )
 
-        # 4. Check if it already exists in the same guild
-        checksum = hashlib.md5(asset.content).hexdigest()
-        duplicate = self.db_conn.duplicate(
-            checksum, str(message.guild.id)
-        )
+        guild_id = str(message.guild.id)
 
-        if duplicate:
+        if await self.db_conn.find_by_pixel_hash(pixel_hash, guild_id):
             return await basic_message(
                 message.channel,
-                f"❌ This asset has already been added to the queue",
+                "❌ An asset with the same pixels has already been added",
                 self.CANCEL_MSG
             )
-        
-        # 5. Try to get the path from the cache
 
-        cached_path = self.cache.get(checksum)
+        near = await self.near_duplicates.search(guild_id, phash)
 
-        if not cached_path:
-            path = f"{STORAGE_PATH}/{uuid.uuid4()}.png"
-            self.cache.set(checksum, path)
-        else:
-            path = cached_path
+        if near:
+            await basic_message(
+                message.channel,
+                "⚠️ This asset looks like " + ", ".join(
+                    f"`{_id}`" for _, _id in near[:5]
+                ),
+                "It is still added to the queue"
+            )
 
         # 6. Additional img metadatas, path, etc...
         pre_upload.fill_data(
             checksum=checksum,
-            path=path
+            pixelHash=pixel_hash,
+            phash=phash,
+            path=asset_path(checksum)
         )
 
         # 7. Try to upload it
@@ -315,7 +504,7 @@ class Asset(commands.Cog, Pages):
     
         await ctx.message.delete()
 
-        if self.users_pre_upload[key]:
+        if await self.users_pre_upload.get(key):
             return await basic_message(
                 ctx,
                 "🔒 you already have an upload in progress",
@@ -328,58 +517,143 @@ class Asset(commands.Cog, Pages):
             self.CANCEL_MSG
         )
 
-        self.users_pre_upload.add(
+        await self.users_pre_upload.add(
             ctx,
             msg,
             name=name, type=_type, author=author
         )
 
-    async def asset_view(
+    async def load_preview(self, data: dict) -> str:
+        """
+            Returns the preview path of an asset uploaded before
+            they were recorded, it is generated and recorded once
+        """
+
+        path = await self.bot.image_executor.run(
+            create_preview,
+            data["checksum"],
+            data["path"]
+        )
+
+        await self.db_conn.set_preview_path(data["checksum"], path)
+
+        return path
+
+    async def build_view(
         self,
-        channel: commands.Context,
-        data: dict
-    ):
+        channel: object,
+        data: dict,
+        original: bool=False
+    ) -> dict:
         """
-            Send a discord.Embed object with the asset informations
-            If error, the object will contains an error message
+            Returns the send kwargs of an asset view: a discord.Embed
+            with the asset informations and its image
+
+            The downscaled preview is sent unless original is True
         """
 
+        path = data["path"]
+
+        if not original:
+            path = data.get("previewPath") or await self.load_preview(data)
+
         filename = data["assetName"] + ".png"
         embed = discord.Embed(
             title=data["assetName"],
             description=data["_id"],
             color=0x000000
         )
-        uploader = await self.bot.fetch_user(data["authorID"])
+        uploader = await self.user_names.get(
+            data["authorID"],
+            getattr(channel, "guild", None),
+            data.get("uploaderName")
+        )
 
         embed.set_image(url="attachment://" + filename)
         embed.set_footer(text=f"Uploaded by {uploader} and created by {data['authorName']} on {str(data['createdAt'])[:-7]}")
 
-        msg = await channel.send(
-            embed=embed,
-            file=discord.File(
-                data["path"],
+        return {
+            "embed": embed,
+            "file": discord.File(
+                path,
                 filename=filename
             )
+        }
+
+    async def asset_view(
+        self,
+        channel: commands.Context,
+        data: dict,
+        original: bool=False
+    ):
+        """
+            Send a discord.Embed object with the asset informations
+            If error, the object will contains an error message
+
+            The downscaled preview is sent unless original is True
+        """
+
+        msg = await channel.send(
+            **await self.build_view(channel, data, original)
         )
 
-        self.db_conn.link_msg_id(
+        await self.db_conn.link_msg_id(
             data["_id"],
             str(msg.id),
             str(channel.id)
         )
 
+    async def asset_views(self, ctx: commands.Context, docs: List[dict]):
+        """
+            Sends the views of many assets to their category channel,
+            the routing is resolved once and the message ids are
+            linked in one bulk write
+        """
+
+        channels = await self.db_conn.get_guild_channels(str(ctx.guild.id)) or {}
+
+        def route(_type: str) -> object:
+            channel_id = channels.get(_type)
+
+            if not channel_id or channel_id == "current":
+                return ctx.channel
+
+            return self.bot.get_channel(int(channel_id)) or ctx.channel
+
+        jobs = []
+
+        for doc in docs:
+            channel = route(doc["type"])
+            jobs.append(
+                (channel, functools.partial(self.build_view, channel, doc))
+            )
+
+        messages = await self.sender.send_all(jobs)
+
+        await self.db_conn.link_msg_ids(
+            [
+                (doc["_id"], str(msg.id), str(msg.channel.id))
+                for doc, msg in zip(docs, messages) if msg
+            ]
+        )
+
     @commands.has_permissions(administrator=True)
     @commands.command()
-    async def inspect(self, ctx: commands.Context, _id: str=None):
+    async def inspect(
+        self,
+        ctx: commands.Context,
+        _id: str=None,
+        size: str=None
+    ):
         """
             Allow to administrators to load any asset
+            Add `original` to get the full size file
         """
 
         if not _id:
             return
         
-        res = self.db_conn.get_guild_asset_by_id(_id, str(ctx.guild.id))
+        res = await self.db_conn.get_guild_asset_by_id(_id, str(ctx.guild.id))
 
         if not res:
             return await basic_message(
@@ -387,7 +661,7 @@ class Asset(commands.Cog, Pages):
                 NOT_FOUND_ERROR_MSG
             )
         
-        await self.asset_view(ctx.channel, res)
+        await self.asset_view(ctx.channel, res, size == "original")
 
     @commands.command()
     async def cancel(self, ctx: commands.Context):
@@ -397,89 +671,190 @@ class Asset(commands.Cog, Pages):
 
         key = unique_key(ctx)
 
-        if not self.users_pre_upload[key]:
+        if not await self.users_pre_upload.get(key):
             return
 
-        self.users_pre_upload.remove(key)
+        await self.users_pre_upload.remove(key)
         await basic_message(
             ctx,
             "🔓 Your current upload has been canceled"
         )
 
+    def bulk_targets(self, args: Tuple[str]) -> Tuple[List[str], str]:
+        """
+            Returns (ids, None) or (None, type) for `all <type>`,
+            None if the arguments are not valid
+        """
+
+        if not args:
+            return None
+
+        if args[0] == "all":
+            if len(args) != 2 or not args[1] in ASSET_TYPE.keys():
+                return None
+
+            return None, args[1]
+
+        return list(dict.fromkeys(args))[:BULK_MAX], None
+
     @commands.has_permissions(administrator=True)
     @commands.command()
-    async def accept(self, ctx: commands.Context, _id: str=None):
+    async def accept(self, ctx: commands.Context, *args: str):
         """
-            Accept asset in the waiting queue
+            Accept assets in the waiting queue
+
+            example:
+                `tw accept <id> <id> ...`
+                To accept every queued skin:
+                    `tw accept all skin`
         """
 
-        if not _id:
+        targets = self.bulk_targets(args)
+
+        if not targets:
             return
 
+        ids, _type = targets
+
         await ctx.message.delete()
 
-        res = self.db_conn.accept(_id, str(ctx.guild.id))
+        docs = await self.db_conn.accept_assets(
+            str(ctx.guild.id),
+            ids,
+            _type,
+            BULK_MAX
+        )
 
-        if not res:
+        if not docs:
             return await basic_message(
                 ctx,
                 "❌ This asset is not in the queue"
             )
-        
-        channels = self.db_conn.get_channels(
-            str(ctx.guild.id),
-            res["type"]
-        )
 
-        if not channels or channels[res["type"]] == "current":
-            channel = ctx.channel
-        else:
-            channel = channels[res["type"]]
-            channel = self.bot.get_channel(int(channel))
-        
-        await self.asset_view(channel, res)
+        await self.asset_views(ctx, docs)
+
+        accepted = set(str(doc["_id"]) for doc in docs)
+        missing = [_id for _id in ids or [] if not _id in accepted]
+
+        if len(docs) > 1 or missing:
+            await basic_message(
+                ctx,
+                f"✅ You accepted {len(docs)} asset(s)",
+                missing and "Not in the queue: " + ", ".join(missing)
+            )
 
     @commands.has_permissions(administrator=True)
     @commands.command()
-    async def remove(self, ctx: commands.Context, _id: str=None):
+    async def remove(self, ctx: commands.Context, *args: str):
         """
-            Remove an asset of the guild
+            Remove assets of the guild
+
+            example:
+                `tw remove <id> <id> ...`
+                To remove every queued skin:
+                    `tw remove all skin`
         """
 
-        if not _id:
+        targets = self.bulk_targets(args)
+
+        if not targets:
             return
 
+        ids, _type = targets
+        guild_id = str(ctx.guild.id)
+
         await ctx.message.delete()
 
-        res = self.db_conn.remove_asset_by_id(_id, str(ctx.guild.id))
+        docs = await self.db_conn.remove_assets(guild_id, ids, _type, BULK_MAX)
 
-        if not res:
+        if not docs:
             return await basic_message(
                 ctx,
                 WRONG_ERROR_MSG
             )
-        
+
+        removed = [str(doc["_id"]) for doc in docs]
+
         await basic_message(
             ctx,
-            f"🔥 You removed `{_id}` from this guild"
+            "🔥 You removed " + ", ".join(f"`{_id}`" for _id in removed) + " from this guild"
         )
-        
-        checksum = res["checksum"]
-        on_other_guild = self.db_conn.find_by_checksum(checksum)
 
-        if on_other_guild:
-            return
+        for doc in docs:
+            if doc.get("phash"):
+                self.near_duplicates.remove(guild_id, doc["phash"], str(doc["_id"]))
 
-        self.cache.delete(checksum)
-        os.remove(res["path"])
+        # The files are shared by the guilds with the same checksum
+        paths = {doc["checksum"]: doc["path"] for doc in docs}
+        used = await self.db_conn.get_existing_checksums(list(paths.keys()))
 
-        try:
-            channel = self.bot.get_channel(int(res["discord_channel_id"]))
-            msg = await channel.fetch_message(res["discord_msg_id"])
+        for checksum, path in paths.items():
+            if checksum in used:
+                continue
 
-            await msg.delete()
-        except Exception as error:
-            return
+            remove_asset(path)
+            remove_asset(preview_path(checksum))
+
+        # Accepted asset views
+        messages = {}
+
+        for doc in docs:
+            if not doc.get("discord_msg_id"):
+                continue
+
+            channel = self.bot.get_channel(int(doc["discord_channel_id"]))
+
+            if channel:
+                messages.setdefault(channel, []).append(int(doc["discord_msg_id"]))
+
+        await self.sender.delete_all(messages)
+
+    async def fetch_page(self, source: Tuple, key: Tuple=None) -> Tuple[List[str], Tuple]:
+        """
+            Returns an asset listing page starting after key
+            and the key of the following page (None on the last page)
+
+            source is (TwUtilsDB query method name, query args)
+        """
+
+        query, args = source
+        docs = await getattr(self.db_conn, query)(
+            *args,
+            limit=LISTING_PAGE_SIZE + 1,
+            after=key
+        )
+
+        if not docs:
+            return [], None
+
+        # The extra document tells if there is a next page
+        more = len(docs) > LISTING_PAGE_SIZE
+        docs = docs[:LISTING_PAGE_SIZE]
+        key = listing_key(docs[-1]) if more else None
+
+        return format_assets(docs), key
+
+    async def create_asset_listing(
+        self,
+        ctx: commands.Context,
+        query: str,
+        *args: list
+    ):
+        """
+            Sends a paginated asset listing, only the first page
+            is fetched, the next ones when the user moves to them
+        """
+
+        source = (query, args)
+        content, key = await self.fetch_page(source)
+
+        if not content:
+            return await basic_message(
+                ctx,
+                NOT_FOUND_ERROR_MSG
+            )
+
+        await self.create_lazy_pages(ctx, content, source, key)
 
     @commands.command()
     async def findall(self, ctx: commands.Context, _type: str=None):
@@ -490,20 +865,13 @@ class Asset(commands.Cog, Pages):
         if not _type:
             return
 
-        res = self.db_conn.get_assets_by_type(
+        await self.create_asset_listing(
+            ctx,
+            "get_assets_by_type",
             str(ctx.guild.id),
             _type
         )
 
-        if not res:
-            return await basic_message(
-                ctx,
-                NOT_FOUND_ERROR_MSG
-            )
-        
-        pages = create_asset_pages(res)
-        await self.create_pages(ctx, pages)
-
     @commands.command()
     async def findname(self, ctx: commands.Context, name: str=None):
         """
@@ -513,30 +881,29 @@ class Asset(commands.Cog, Pages):
         if not name:
             return
 
-        res = self.db_conn.get_assets_contain_name(
+        await self.create_asset_listing(
+            ctx,
+            "get_assets_contain_name",
             str(ctx.guild.id),
             name
         )
-
-        if not res:
-            return await basic_message(
-                ctx,
-                NOT_FOUND_ERROR_MSG
-            )
-    
-        pages = create_asset_pages(res)
-        await self.create_pages(ctx, pages)
     
     @commands.command()
-    async def load(self, ctx: commands.Context, _id: str=None):
+    async def load(
+        self,
+        ctx: commands.Context,
+        _id: str=None,
+        size: str=None
+    ):
         """
-            Upload asset by a specific id       
+            Upload asset by a specific id
+            Add `original` to get the full size file
         """
 
         if not _id:
             return
         
-        res = self.db_conn.get_accepted_asset_by_id(_id, str(ctx.guild.id))
+        res = await self.db_conn.get_accepted_asset_by_id(_id, str(ctx.guild.id))
 
         if not res:
             return await basic_message(
@@ -544,7 +911,7 @@ class Asset(commands.Cog, Pages):
                 NOT_FOUND_ERROR_MSG
             )
         
-        await self.asset_view(ctx.channel, res)
+        await self.asset_view(ctx.channel, res, size == "original")
 
     @commands.has_permissions(administrator=True)
     @commands.command()
@@ -553,16 +920,11 @@ class Asset(commands.Cog, Pages):
             Upload asset by a specific id       
         """
 
-        res = self.db_conn.get_queue(str(ctx.guild.id))
-
-        if not res:
-            return await basic_message(
-                ctx,
-                NOT_FOUND_ERROR_MSG
-            )
-        
-        pages = create_asset_pages(res)
-        await self.create_pages(ctx, pages)
+        await self.create_asset_listing(
+            ctx,
+            "get_queue",
+            str(ctx.guild.id)
+        )
 
     @commands.has_permissions(administrator=True)
     @commands.command()
@@ -592,7 +954,7 @@ class Asset(commands.Cog, Pages):
                 "❌ Unauthorized channel"
             )
 
-        res = self.db_conn.set_channel(
+        res = await self.db_conn.set_channel(
             str(ctx.guild.id),
             channel_id,
             category
@@ -618,4 +980,4 @@ class Asset(commands.Cog, Pages):
         )
 
 def setup(bot: commands.Bot):
-    bot.add_cog(Asset(bot))
+    return bot.add_cog(Asset(bot))
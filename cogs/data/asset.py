@@ -42,10 +42,11 @@ ASSET_TYPE = {
 
 WRONG_ERROR_MSG = "⚠️ Something went wrong"
 NOT_FOUND_ERROR_MSG = "☁️ Nothing has not been found"
+BUSY_ERROR_MSG = "⏳ The renderer is busy, try again in a few seconds"
 
-def is_asset_valid(_type: str, img: Image) -> bool:
+def is_size_valid(_type: str, width: int, height: int) -> bool:
     """
-        Check if the asset has a valid size
+        Check if the asset dimensions are valid
     """
 
     data = None
@@ -58,11 +59,18 @@ def is_asset_valid(_type: str, img: Image) -> bool:
     div = data["divisor"]
     size = data["max_size"]
 
-    if img.size[0] % div["w"] or img.size[1] % div["h"]:
+    if width % div["w"] or height % div["h"]:
         return False
-    if data["size"] == {"w": -1, "h": -1}:
-        return True
-    if img.size[0] > size["w"] or img.size[1] > size["h"]:
+
+    # Every upload is decoded, even the free sized types are bounded
+    if width > size["w"] or height > size["h"]:
         return False
 
     return True
+
+def is_asset_valid(_type: str, img: Image) -> bool:
+    """
+        Check if the asset has a valid size
+    """
+
+    return is_size_valid(_type, *img.size)
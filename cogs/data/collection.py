@@ -1,5 +1,7 @@
 """collection module"""
 
+import pymongo
+
 from cogs.data.asset import ASSET_TYPE
 
 ASSET_COLLECTION = {
@@ -27,6 +29,10 @@ ASSET_COLLECTION = {
                 "bsonType": "string",
                 "description": "represents the file path, must be a string and required"
             },
+            "previewPath": {
+                "bsonType": "string",
+                "description": "represents the downscaled preview file path, must be a string"
+            },
             "createdAt": {
                 "bsonType": "date",
                 "description": "represents the asset checksum, must be a date"
@@ -35,6 +41,29 @@ ASSET_COLLECTION = {
                 "bsonType": "string",
                 "description": "represents the asset checksum, must be a string, required"
             },
+            "storedChecksum": {
+                "bsonType": "string",
+                "description": "represents the checksum of the stored (optimized) file, must be a string"
+            },
+            "savedBytes": {
+                "bsonType": "int",
+                "description": "represents the bytes saved by the optimizer, must be an int"
+            },
+            "pixelHash": {
+                "bsonType": "string",
+                "description": "represents the SHA-1 of the decoded pixels, must be a string"
+            },
+            "phash": {
+                "bsonType": "string",
+                "description": "represents the asset perceptual hash (hex), must be a string"
+            },
+            "nameGrams": {
+                "bsonType": "array",
+                "items": {
+                    "bsonType": "string"
+                },
+                "description": "represents the asset name search grams, must be a string array"
+            },
             "guildID": {
                 "bsonType": "string",
                 "description": "represents the asset checksum, must be a string, required"
@@ -43,6 +72,10 @@ ASSET_COLLECTION = {
                 "bsonType": "string",
                 "description": "represents the asset checksum, must be a string and required"
             },
+            "uploaderName": {
+                "bsonType": "string",
+                "description": "represents the uploader Discord name at upload time, must be a string"
+            },
             "authorName": {
                 "bsonType": "string",
                 "description": "represents the asset checksum, must be a string and required"
@@ -51,6 +84,14 @@ ASSET_COLLECTION = {
                 "bsonType": "bool",
                 "description": "represents the asset state, must be a bool"
             },
+            "acceptBatch": {
+                "bsonType": "objectId",
+                "description": "represents the bulk accept that accepted the asset, must be an objectId"
+            },
+            "removeBatch": {
+                "bsonType": "objectId",
+                "description": "represents the bulk remove that is removing the asset, must be an objectId"
+            },
             "discord_msg_id": {
                 "bsonType": "string",
                 "description": "represents the asset Discord linked message, must be a string"
@@ -92,3 +133,72 @@ CHANNEL_COLLECTION = {
         }
     }
 }
+
+# (keys, options), one entry per TwUtilsDB query shape
+ASSET_INDEXES = [
+    # duplicate
+    (
+        [("guildID", pymongo.ASCENDING), ("checksum", pymongo.ASCENDING)],
+        {"unique": True}
+    ),
+    # find_by_checksum
+    (
+        [("checksum", pymongo.ASCENDING)],
+        {}
+    ),
+    # get_queue
+    (
+        [
+            ("guildID", pymongo.ASCENDING),
+            ("accepted", pymongo.ASCENDING),
+            ("createdAt", pymongo.DESCENDING),
+            ("_id", pymongo.DESCENDING)
+        ],
+        {}
+    ),
+    # get_assets_contain_name
+    (
+        [
+            ("guildID", pymongo.ASCENDING),
+            ("accepted", pymongo.ASCENDING),
+            ("nameGrams", pymongo.ASCENDING),
+            ("createdAt", pymongo.DESCENDING),
+            ("_id", pymongo.DESCENDING)
+        ],
+        {}
+    ),
+    # get_assets_by_type
+    (
+        [
+            ("guildID", pymongo.ASCENDING),
+            ("type", pymongo.ASCENDING),
+            ("accepted", pymongo.ASCENDING),
+            ("createdAt", pymongo.DESCENDING),
+            ("_id", pymongo.DESCENDING)
+        ],
+        {}
+    ),
+    # find_by_pixel_hash
+    (
+        [("guildID", pymongo.ASCENDING), ("pixelHash", pymongo.ASCENDING)],
+        {}
+    ),
+    # get_phashes
+    (
+        [("guildID", pymongo.ASCENDING), ("phash", pymongo.ASCENDING)],
+        {}
+    ),
+    # get_unoptimized_assets
+    (
+        [("storedChecksum", pymongo.ASCENDING)],
+        {}
+    )
+]
+
+CHANNEL_INDEXES = [
+    # get_guild_channels, set_channel
+    (
+        [("guildID", pymongo.ASCENDING)],
+        {"unique": True}
+    )
+]
@@ -1,44 +1,44 @@
 """renderer cog"""
 
+import asyncio
 import discord
 import json
-import uuid
 
 from discord.ext import commands
+from typing import Dict, List, Union
 from utils.config import DockerConfig
 
 from utils.utilities import basic_message, send_img
-from utils.database import TwUtilsDB
-from cogs.apis.twutils import TwUtilsAPI
-from cogs.data.asset import WRONG_ERROR_MSG, NOT_FOUND_ERROR_MSG
+from utils.render_cache import RenderCache
+from utils.image import contact_sheet
+from utils.scheduler import SchedulerBusy
+from cogs.data.asset import (
+    WRONG_ERROR_MSG,
+    NOT_FOUND_ERROR_MSG,
+    BUSY_ERROR_MSG
+)
 
 config = DockerConfig("config.ini")
 
+GRID_MAX_SKINS = 25
+
 async def send_render(
     message: discord.message,
-    call: callable,
-    data: json,
+    img: bytes,
+    url: str,
     name: str=None
     ):
     """
         It will send the rendered skin to a Discord channel
     """
 
-    img = call(data)
-    url = data["skin"]
-
     if not img:
         return await basic_message(
             message.channel,
             "❌ Error, invalid skin or invalid command format"
         )
 
-    filename = str(uuid.uuid1()) + ".png"
-
-    with open(filename, "wb") as f:
-        f.write(img)
-    
-    await send_img(message, name, filename, url)
+    await send_img(message, name, img, url)
 
 class Renderer(commands.Cog):
     """
@@ -46,9 +46,129 @@ class Renderer(commands.Cog):
         (via upload or commands)
     """
 
-    def __init__(self):
-        self.db_conn = TwUtilsDB()
-    
+    def __init__(self, bot: commands.Bot):
+        self.db_conn = bot.conn
+        self.bot = bot
+
+    async def render(
+        self,
+        call: callable,
+        data: json,
+        checksum: str=None,
+        guild_id: int=None
+    ) -> Union[bytes, None]:
+        """
+            Renders a skin, through the render scheduler if guild_id
+            is given. If the checksum is known, the result is cached
+            with the render parameters
+        """
+
+        key = None
+
+        if checksum:
+            key = RenderCache.key(checksum, call.__qualname__, data)
+            img = await self.bot.render_cache.get(key)
+
+            if img:
+                return img
+
+        if guild_id is None:
+            img = await call(data)
+        else:
+            img = await self.bot.scheduler.submit(guild_id, call, data)
+
+        if img and key:
+            await self.bot.render_cache.set(key, img)
+
+        return img
+
+    async def render_and_send(
+        self,
+        message: discord.Message,
+        call: callable,
+        data: json,
+        checksum: str=None,
+        name: str=None
+    ):
+        """
+            Renders a skin and sends it, or tells the user to retry
+            if the render scheduler is full
+        """
+
+        try:
+            img = await self.render(call, data, checksum, message.guild.id)
+        except SchedulerBusy:
+            return await basic_message(message.channel, BUSY_ERROR_MSG)
+
+        await send_render(message, img, data["skin"], name)
+
+    async def render_grid(
+        self,
+        assets: List[Dict],
+        guild_id: int
+    ) -> Union[bytes, None]:
+        """
+            Renders the assets and composites them into one labeled image
+
+            The cached tiles are read first, every other one is a scheduler
+            job of the guild. They are only submitted while the guild queue
+            has room, the next ones wait for a job to end. Raises
+            SchedulerBusy if the first tile can not be queued, the tiles
+            already submitted are cancelled if the grid is
+        """
+
+        call = self.bot.render_engine.render
+        scheduler = self.bot.scheduler
+
+        datas = [
+            {"skin": asset["path"], "eye": "default_eye"}
+            for asset in assets
+        ]
+        keys = [
+            RenderCache.key(asset["checksum"], call.__qualname__, data)
+            for asset, data in zip(assets, datas)
+        ]
+        imgs = list(
+            await asyncio.gather(*map(self.bot.render_cache.get, keys))
+        )
+
+        tasks = {}
+
+        try:
+            for i, data in enumerate(datas):
+                if imgs[i]:
+                    continue
+
+                while not scheduler.free(guild_id):
+                    if not tasks:
+                        raise SchedulerBusy()
+
+                    await scheduler.wait_slot()
+
+                tasks[i] = scheduler.enqueue(guild_id, call, data)
+
+            for i, img in zip(tasks, await asyncio.gather(*tasks.values())):
+                imgs[i] = img
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+
+            raise
+
+        for i in tasks:
+            if imgs[i]:
+                await self.bot.render_cache.set(keys[i], imgs[i])
+
+        images = [
+            (asset["assetName"], img)
+            for asset, img in zip(assets, imgs) if img
+        ]
+
+        if not images:
+            return None
+
+        return await self.bot.image_executor.run(contact_sheet, images)
+
     async def upload_handler(self, message: discord.Message):
         """
             Rendering uploaded valid skins
@@ -67,7 +187,7 @@ class Renderer(commands.Cog):
         url = attachs[0].url
         data = {"skin": url}
 
-        await send_render(message, TwUtilsAPI.render, data)
+        await self.render_and_send(message, self.bot.render_engine.render, data)
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -94,7 +214,7 @@ class Renderer(commands.Cog):
         if not skin_id:
             return
 
-        res = self.db_conn.get_accepted_asset_by_id(
+        res = await self.db_conn.get_accepted_asset_by_id(
             skin_id,
             str(ctx.guild.id)
         )
@@ -110,7 +230,13 @@ class Renderer(commands.Cog):
             "eye": eye or "default_eye"
         }
 
-        await send_render(ctx, TwUtilsAPI.render, data, res["assetName"])
+        await self.render_and_send(
+            ctx,
+            self.bot.render_engine.render,
+            data,
+            res["checksum"],
+            res["assetName"]
+        )
     
     @commands.command(aliases=["rendercolor"])
     async def rc(
@@ -129,7 +255,7 @@ class Renderer(commands.Cog):
         if not skin_id or not bcolor or not fcolor or not mode:
             return
 
-        res = self.db_conn.get_accepted_asset_by_id(
+        res = await self.db_conn.get_accepted_asset_by_id(
             skin_id,
             str(ctx.guild.id)
         )
@@ -148,7 +274,70 @@ class Renderer(commands.Cog):
             "eye": eye or "default_eye"
         }
 
-        await send_render(ctx, TwUtilsAPI.render_color, data, res["assetName"])
+        await self.render_and_send(
+            ctx,
+            self.bot.render_engine.render_color,
+            data,
+            res["checksum"],
+            res["assetName"]
+        )
+
+    @commands.command(aliases=["rendergrid"])
+    async def rgrid(self, ctx: commands.Context, *skin_ids: str):
+        """
+            Render many skins from skins.tw in one image
+        """
+
+        if not skin_ids:
+            return
+
+        skin_ids = [_id.lower() for _id in skin_ids[:GRID_MAX_SKINS]]
+        res = await self.db_conn.get_accepted_assets_by_ids(
+            skin_ids,
+            str(ctx.guild.id)
+        )
+
+        if not res:
+            return await basic_message(
+                ctx,
+                NOT_FOUND_ERROR_MSG
+            )
+
+        # Keeps the order of the command
+        res.sort(key=lambda asset: skin_ids.index(str(asset["_id"])))
+
+        try:
+            img = await self.render_grid(res, ctx.guild.id)
+        except SchedulerBusy:
+            return await basic_message(ctx, BUSY_ERROR_MSG)
+
+        if not img:
+            return await basic_message(
+                ctx,
+                WRONG_ERROR_MSG
+            )
+
+        await send_img(ctx, f"{len(res)} skins", img)
+
+    @commands.has_permissions(administrator=True)
+    @commands.command()
+    async def renderstats(self, ctx: commands.Context):
+        """
+            Displays the render cache, scheduler and image executor counters
+        """
+
+        sections = {
+            "Render cache": self.bot.render_cache.stats(),
+            "Render scheduler": self.bot.scheduler.stats(),
+            "Image executor": self.bot.image_executor.stats()
+        }
+        msg = ""
+
+        for title, stats in sections.items():
+            lines = [f"{k}: {v}" for k, v in stats.items()]
+            msg += f"📊 {title}\n```" + "\n".join(lines) + "```"
+
+        await basic_message(ctx, msg)
 
 def setup(bot: commands.Bot):
-    bot.add_cog(Renderer())
+    return bot.add_cog(Renderer(bot))
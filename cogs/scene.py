@@ -1,32 +1,61 @@
 """scene cog"""
 
-import uuid
+import logging
 
-from discord.ext import commands
+from discord.ext import commands, tasks
 from typing import List, Dict
 
-from cogs.apis.twutils import TwUtilsAPI
 from cogs.data.asset import (
     WRONG_ERROR_MSG,
-    NOT_FOUND_ERROR_MSG
+    NOT_FOUND_ERROR_MSG,
+    BUSY_ERROR_MSG
 )
 from utils.page import Pages
-from utils.database import TwUtilsDB
+from utils.scheduler import SchedulerBusy
+from utils.render_cache import RenderCache
+from utils.config import DockerConfig
 from utils.utilities import (
     send_img,
     basic_message,
     make_groups
 )
 
+log = logging.getLogger(__name__)
+config = DockerConfig("config.ini")
+
+SCENE_LIST_TTL = int(config.get_var("TW_UTILS", "SCENE_LIST_TTL") or 3600)
+
 class Scene(commands.Cog, Pages):
     """
         Managing the scenes system
     """
 
-    def __init__(self):
-        Pages.__init__(self)
+    def __init__(self, bot: commands.Bot):
+        Pages.__init__(self, "scene_pages", bot)
+
+        self.db_conn = bot.conn
+        self.bot = bot
+
+        self.scene_list = None
+        self.refresh_scene_list.start()
+
+    def cog_unload(self):
+        self.refresh_scene_list.cancel()
+
+    @tasks.loop(seconds=SCENE_LIST_TTL)
+    async def refresh_scene_list(self):
+        """
+            Refreshes the cached scene list in the background,
+            the previous list is kept if the API is unavailable
+        """
+
+        scenes = await self.bot.twutils.scene_list()
+
+        if not scenes:
+            log.warning("Unable to refresh the scene list")
+            return
 
-        self.db_conn = TwUtilsDB()
+        self.scene_list = scenes
 
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction: object, user: object):
@@ -50,7 +79,7 @@ class Scene(commands.Cog, Pages):
         if not name or not skin_id:
             return
         
-        res = self.db_conn.get_accepted_asset_by_id(
+        res = await self.db_conn.get_accepted_asset_by_id(
             skin_id,
             str(ctx.guild.id)
         )
@@ -66,7 +95,21 @@ class Scene(commands.Cog, Pages):
             "skin": res["path"]
         }
 
-        img = TwUtilsAPI.scene(data)
+        key = RenderCache.key(res["checksum"], "TwUtilsAPI.scene", data)
+        img = await self.bot.render_cache.get(key)
+
+        if not img:
+            try:
+                img = await self.bot.scheduler.submit(
+                    ctx.guild.id,
+                    self.bot.twutils.scene,
+                    data
+                )
+            except SchedulerBusy:
+                return await basic_message(ctx, BUSY_ERROR_MSG)
+
+            if img:
+                await self.bot.render_cache.set(key, img)
 
         if not img:
             return await basic_message(
@@ -74,12 +117,7 @@ class Scene(commands.Cog, Pages):
                 WRONG_ERROR_MSG
             )
 
-        filename = str(uuid.uuid1()) + ".png"
-
-        with open(filename, "wb") as f:
-            f.write(img)
-    
-        await send_img(ctx, name, filename)
+        await send_img(ctx, name, img)
 
     @commands.command()
     async def scenes(self, ctx: commands.Context):
@@ -87,7 +125,11 @@ class Scene(commands.Cog, Pages):
             List the availables scene
         """
 
-        scenes = TwUtilsAPI.scene_list()
+        # Only the first call waits for the API
+        if not self.scene_list:
+            await self.refresh_scene_list()
+
+        scenes = self.scene_list
 
         if not scenes:
             return
@@ -97,4 +139,4 @@ class Scene(commands.Cog, Pages):
         await self.create_pages(ctx, page_content)
 
 def setup(bot: commands.Bot):
-    bot.add_cog(Scene())
+    return bot.add_cog(Scene(bot))
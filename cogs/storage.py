@@ -0,0 +1,152 @@
+"""storage cog"""
+
+import asyncio
+import logging
+
+from discord.ext import commands, tasks
+
+from utils.cache import Cache
+from utils.config import DockerConfig
+from utils.scrubber import Scrubber
+from utils.storage import STORAGE_PATH, optimize_asset, replace_file
+from utils.utilities import basic_message
+
+log = logging.getLogger(__name__)
+config = DockerConfig("config.ini")
+
+SCRUB_INTERVAL = int(config.get_var("SCRUBBER", "INTERVAL") or 86400)
+
+OPTIMIZER = (config.get_var("OPTIMIZER", "ENABLED") or "false").lower() == "true"
+OPTIMIZE_INTERVAL = int(config.get_var("OPTIMIZER", "INTERVAL") or 60)
+OPTIMIZE_BATCH_SIZE = int(config.get_var("OPTIMIZER", "BATCH_SIZE") or 20)
+
+class Storage(commands.Cog):
+    """
+        Keeps the storage directory and the asset documents consistent
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+        # The former checksum -> path keys only exist with Redis
+        redis = Cache() if config.get_var("REDIS", "HOST") else None
+
+        self.scrubber = Scrubber(
+            bot.conn,
+            STORAGE_PATH,
+            float(config.get_var("SCRUBBER", "IO_RATE") or 4) * 1024 * 1024,
+            int(config.get_var("SCRUBBER", "BATCH_SIZE") or 200),
+            float(config.get_var("SCRUBBER", "GRACE") or 3600),
+            redis,
+            bot.image_executor
+        )
+
+        self.optimizer_stats = {
+            "optimized_files": 0,
+            "saved_bytes": 0
+        }
+
+        self.scrub.start()
+
+        if OPTIMIZER:
+            self.optimize.start()
+
+    def cog_unload(self):
+        self.scrub.cancel()
+        self.optimize.cancel()
+
+    @tasks.loop(seconds=SCRUB_INTERVAL)
+    async def scrub(self):
+        """
+            Runs a scrubber pass in the background
+        """
+
+        try:
+            report = await self.scrubber.run()
+        except Exception:
+            log.exception("Storage scrub failed")
+            return
+
+        log.info(
+            "Storage scrubbed: " +
+            ", ".join(f"{k}={v}" for k, v in report.items() if not k.endswith("_ids"))
+        )
+
+    @scrub.before_loop
+    async def before_scrub(self):
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=OPTIMIZE_INTERVAL)
+    async def optimize(self):
+        """
+            Losslessly re-encodes the files not optimized yet,
+            one at a time to leave the CPU to the live traffic
+        """
+
+        try:
+            docs = await self.bot.conn.get_unoptimized_assets(OPTIMIZE_BATCH_SIZE)
+        except Exception:
+            log.exception("Unable to get the assets to optimize")
+            return
+
+        # Guilds sharing a file share the result
+        paths = {doc["checksum"]: doc["path"] for doc in docs}
+
+        loop = asyncio.get_event_loop()
+
+        for checksum, path in paths.items():
+            res = await self.bot.image_executor.run(optimize_asset, path)
+
+            # Missing or broken files are reported by the scrubber
+            optimized, stored_checksum, saved = res or (None, checksum, 0)
+
+            # Recorded before the file is replaced, the scrubber
+            # accepts both checksums in between
+            try:
+                await self.bot.conn.set_stored_checksum(checksum, stored_checksum, saved)
+            except Exception:
+                log.exception(f"Unable to record the optimized file {path}")
+                continue
+
+            if not optimized:
+                continue
+
+            try:
+                await loop.run_in_executor(None, replace_file, path, optimized)
+            except OSError:
+                log.exception(f"Unable to write the optimized file {path}")
+                continue
+
+            if saved:
+                self.optimizer_stats["optimized_files"] += 1
+                self.optimizer_stats["saved_bytes"] += saved
+
+    @optimize.before_loop
+    async def before_optimize(self):
+        await self.bot.wait_until_ready()
+
+    @commands.has_permissions(administrator=True)
+    @commands.command()
+    async def storagestats(self, ctx: commands.Context):
+        """
+            Displays the last storage scrubber report
+            and the optimizer counters
+        """
+
+        sections = {
+            "Storage scrubber": self.scrubber.last_report,
+            "PNG optimizer": self.optimizer_stats if OPTIMIZER else {}
+        }
+        msg = ""
+
+        for title, stats in sections.items():
+            if not stats:
+                continue
+
+            lines = [f"{k}: {v}" for k, v in stats.items()]
+            msg += f"📊 {title}\n```" + "\n".join(lines) + "```"
+
+        await basic_message(ctx, msg or "📊 No storage scrub has run yet")
+
+def setup(bot: commands.Bot):
+    return bot.add_cog(Storage(bot))
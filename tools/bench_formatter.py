@@ -0,0 +1,109 @@
+"""
+    Compares the listing formatter with the former pandas one
+
+    Both run in a fresh interpreter, it reports the import time,
+    the formatting time and the peak RSS. The pandas version needs
+    pandas to be installed.
+
+    usage: python -m tools.bench_formatter [--documents 10000]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+COMMON = """
+import json, resource, time
+from bson import ObjectId
+
+docs = [
+    {
+        "_id": ObjectId(),
+        "assetName": "asset%d" % i,
+        "authorName": "author%d" % (i % 50),
+        "type": "skin",
+        "path": "./storage/%d.png" % i
+    }
+    for i in range(DOCUMENTS)
+]
+"""
+
+PANDAS = """
+start = time.perf_counter()
+import discord
+import pandas as pd
+imported = time.perf_counter() - start
+
+def format_find(documents, *keys):
+    ret = {}
+
+    for document in documents:
+        for key in keys:
+            if not key in document.keys():
+                continue
+            try:
+                ret[key].append(document[key])
+            except KeyError:
+                ret[key] = [document[key]]
+
+    return ret
+
+def format_assets(documents):
+    parsed = format_find(documents, "_id", "assetName", "authorName", "type")
+    return pd.DataFrame(parsed).to_string(index=False).split("\\n")
+"""
+
+STREAMING = """
+start = time.perf_counter()
+from utils.utilities import format_assets
+imported = time.perf_counter() - start
+"""
+
+MEASURE = """
+start = time.perf_counter()
+lines = format_assets(docs)
+formatted = time.perf_counter() - start
+
+print(json.dumps({
+    "import_ms": imported * 1000,
+    "format_ms": formatted * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "lines": len(lines)
+}))
+"""
+
+def run(code: str) -> dict:
+    """
+        Runs the benchmark code in a new interpreter
+    """
+
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main(args: argparse.Namespace):
+    common = COMMON.replace("DOCUMENTS", str(args.documents))
+    results = {
+        "pandas": run(common + PANDAS + MEASURE),
+        "streaming": run(common + STREAMING + MEASURE)
+    }
+
+    print(f"{'formatter':<10} {'import ms':>10} {'format ms':>10} {'rss MB':>8}")
+
+    for name, res in results.items():
+        print(
+            f"{name:<10} {res['import_ms']:>10.1f} "
+            f"{res['format_ms']:>10.1f} {res['rss_mb']:>8.1f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=10000)
+
+    main(parser.parse_args())
@@ -0,0 +1,208 @@
+"""
+    Compares the local tee renderer with the tw-utils API
+
+    Parity: the local renders of the fixed cases (render_reference/cases.json,
+    skins in render_reference/skins) are compared with the reference renders
+    in render_reference/renders. A case fails if the mean absolute RGBA
+    difference or the share of pixels off by more than --pixel-threshold
+    goes over the tolerances, or if its reference is missing. The references
+    are recorded from the API with --record (the skin paths sent to the API
+    are absolute, it must be able to read them).
+
+    Benchmark: for every skin given, it measures both render latencies and
+    the difference between the two results.
+
+    usage: python -m tools.bench_render [--record]
+           python -m tools.bench_render [-n 20] --bench skin.png ...
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+import numpy as np
+
+from PIL import Image
+
+from cogs.apis.twutils import TwUtilsAPI
+from cogs.apis.teerender import REFERENCE_PATH, TeeRenderer
+
+def difference(a: bytes, b: bytes) -> tuple:
+    """
+        Returns the mean absolute RGBA difference (0 - 255)
+        and the per pixel maximum channel difference
+    """
+
+    a = np.asarray(Image.open(io.BytesIO(a)).convert("RGBA"), dtype=np.int16)
+    b = np.asarray(Image.open(io.BytesIO(b)).convert("RGBA"), dtype=np.int16)
+
+    if a.shape != b.shape:
+        return float("inf"), None
+
+    diff = np.abs(a - b)
+
+    return float(diff.mean()), diff.max(axis=-1)
+
+def load_cases() -> list:
+    """
+        Returns the fixed parity cases with their absolute skin path
+    """
+
+    with open(os.path.join(REFERENCE_PATH, "cases.json")) as f:
+        cases = json.load(f)
+
+    for case in cases:
+        case["skin"] = os.path.abspath(
+            os.path.join(REFERENCE_PATH, "skins", case["skin"])
+        )
+
+    return cases
+
+def render_call(renderer: object, case: dict) -> tuple:
+    """
+        Returns the render method and its data for a case
+    """
+
+    data = {k: v for k, v in case.items() if k != "name"}
+
+    if "mode" in data:
+        return renderer.render_color, data
+
+    return renderer.render, data
+
+async def record(api: TwUtilsAPI) -> int:
+    """
+        Writes the API renders of the fixed cases as the references
+    """
+
+    path = os.path.join(REFERENCE_PATH, "renders")
+    os.makedirs(path, exist_ok=True)
+    failed = False
+
+    for case in load_cases():
+        call, data = render_call(api, case)
+        img = await call(data)
+
+        if not img:
+            print(f"[-] {case['name']}: the API did not render it")
+            failed = True
+            continue
+
+        with open(os.path.join(path, case["name"] + ".png"), "wb") as f:
+            f.write(img)
+
+        print(f"[+] {case['name']}")
+
+    return int(failed)
+
+async def check(local: TeeRenderer, args: argparse.Namespace) -> int:
+    """
+        Compares the local renders of the fixed cases with the references
+    """
+
+    failed = False
+
+    print(f"{'case':<20} {'mean':>7} {'off px %':>9}")
+
+    for case in load_cases():
+        reference = os.path.join(REFERENCE_PATH, "renders", case["name"] + ".png")
+
+        if not os.path.exists(reference):
+            print(f"{case['name']:<20} no reference, record it with --record")
+            failed = True
+            continue
+
+        with open(reference, "rb") as f:
+            reference = f.read()
+
+        call, data = render_call(local, case)
+        img = await call(data)
+
+        if not img:
+            print(f"{case['name']:<20} local render failed")
+            failed = True
+            continue
+
+        mean, pixels = difference(img, reference)
+
+        if pixels is None:
+            print(f"{case['name']:<20} size mismatch")
+            failed = True
+            continue
+
+        off = float((pixels > args.pixel_threshold).mean() * 100)
+        failed |= mean > args.threshold or off > args.max_off
+
+        print(f"{case['name']:<20} {mean:>7.3f} {off:>9.3f}")
+
+    return int(failed)
+
+async def timed(call: callable, data: dict, n: int) -> tuple:
+    """
+        Returns the median latency (ms) and the last result
+    """
+
+    times = []
+    ret = None
+
+    for _ in range(n):
+        start = time.perf_counter()
+        ret = await call(data)
+        times.append((time.perf_counter() - start) * 1000)
+
+    return float(np.median(times)), ret
+
+async def bench(api: TwUtilsAPI, local: TeeRenderer, args: argparse.Namespace):
+    """
+        Prints the local and API latencies for every skin
+    """
+
+    print(f"{'skin':<30} {'local ms':>9} {'api ms':>9} {'diff':>7}")
+
+    for path in args.bench:
+        # Bypass the single-flight layer, every call must hit the API
+        data = {"skin": os.path.abspath(path), "eye": "default_eye"}
+        local_ms, local_img = await timed(local.render, data, args.n)
+        api_ms, api_img = await timed(
+            lambda d: api._request("/render", d),
+            data,
+            args.n
+        )
+
+        diff = float("inf")
+
+        if local_img and api_img:
+            diff, _ = difference(local_img, api_img)
+
+        print(f"{os.path.basename(path):<30} {local_ms:>9.2f} {api_ms:>9.2f} {diff:>7.2f}")
+
+async def main(args: argparse.Namespace) -> int:
+    api = TwUtilsAPI()
+    local = TeeRenderer(api)
+    ret = 0
+
+    try:
+        if args.record:
+            ret = await record(api)
+        elif args.bench:
+            await bench(api, local, args)
+        else:
+            ret = await check(local, args)
+    finally:
+        await api.close()
+
+    return ret
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--bench", nargs="+", metavar="SKIN")
+    parser.add_argument("-n", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=1.0)
+    parser.add_argument("--pixel-threshold", type=int, default=16)
+    parser.add_argument("--max-off", type=float, default=0.5)
+
+    sys.exit(asyncio.run(main(parser.parse_args())))
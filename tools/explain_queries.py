@@ -0,0 +1,215 @@
+"""
+    Checks that every TwUtilsDB query is served by an index
+
+    It seeds a scratch database, calls every query method, records the
+    commands sent to MongoDB and explains them. It fails if a winning plan
+    contains a COLLSCAN or an in-memory SORT stage.
+
+    usage: python -m tools.explain_queries [--database twutils_explain] [--assets 2000]
+"""
+
+import argparse
+import inspect
+import random
+import sys
+
+from datetime import datetime, timedelta
+from pymongo import monitoring
+
+from cogs.data.asset import ASSET_TYPE
+from utils.database import TwUtilsDB, name_grams
+
+FORBIDDEN_STAGES = {"COLLSCAN", "SORT"}
+
+# Fields the explain command does not accept
+COMMAND_META = {
+    "lsid",
+    "$db",
+    "$clusterTime",
+    "$readPreference",
+    "txnNumber",
+    "signature",
+    "writeConcern"
+}
+
+# Methods that do not run a query
+NOT_QUERIES = {
+    "add_to_queue",
+    "add_guild",
+    "init_collection",
+    "init_collections",
+    "init_indexes",
+    "set_database"
+}
+
+class CommandRecorder(monitoring.CommandListener):
+    """
+        Records the commands sent to MongoDB
+    """
+
+    def __init__(self):
+        self.commands = []
+        self.recording = False
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if not self.recording:
+            return
+
+        command = {
+            k: v for k, v in event.command.items() if k not in COMMAND_META
+        }
+        self.commands.append(command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        pass
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        pass
+
+def seed(db: TwUtilsDB, n: int) -> dict:
+    """
+        Fills the scratch database and returns sample values
+    """
+
+    db.client.drop_database(db.database.name)
+    db.init_collections()
+
+    now = datetime.now()
+    types = list(ASSET_TYPE.keys())
+    docs = []
+
+    for i in range(n):
+        docs.append(
+            {
+                "assetName": f"asset{i}",
+                "nameGrams": name_grams(f"asset{i}"),
+                "type": random.choice(types),
+                "path": f"./storage/{i}.png",
+                "checksum": "%032x" % i,
+                "pixelHash": "%040x" % i,
+                "phash": "%016x" % random.getrandbits(64),
+                "guildID": str(i % 10),
+                "authorID": "1",
+                "authorName": "author",
+                "createdAt": now - timedelta(minutes=i),
+                "accepted": bool(i % 3)
+            }
+        )
+
+    ids = db.database["discordAssets"].insert_many(docs).inserted_ids
+    db.database["discordChannels"].insert_many(
+        [{"guildID": str(i), "skin": "1"} for i in range(10)]
+    )
+
+    return {
+        "guild_id": "1",
+        "id": str(ids[1]),
+        "ids": [str(_id) for _id in ids[1:20:10]],
+        "checksum": docs[1]["checksum"],
+        "pixel_hash": docs[1]["pixelHash"],
+        "after": (docs[21]["createdAt"], ids[21])
+    }
+
+def calls(db: TwUtilsDB, sample: dict) -> dict:
+    """
+        Returns the query methods with sample arguments
+    """
+
+    guild_id = sample["guild_id"]
+    _id = sample["id"]
+
+    return {
+        "duplicate": (db.duplicate, sample["checksum"], guild_id),
+        "find_by_checksum": (db.find_by_checksum, sample["checksum"]),
+        "find_by_pixel_hash": (db.find_by_pixel_hash, sample["pixel_hash"], guild_id),
+        "get_phashes": (db.get_phashes, guild_id),
+        "get_existing_checksums": (db.get_existing_checksums, [sample["checksum"]]),
+        "scan_assets": (db.scan_assets, sample["after"][1], 10),
+        "update_assets": (db.update_assets, {sample["after"][1]: {"phash": "0" * 16}}),
+        "get_unoptimized_assets": (db.get_unoptimized_assets, 10),
+        "set_stored_checksum": (db.set_stored_checksum, sample["checksum"], sample["checksum"], 0),
+        "set_preview_path": (db.set_preview_path, sample["checksum"], sample["checksum"]),
+        "is_stored_checksum": (db.is_stored_checksum, sample["checksum"], sample["checksum"]),
+        "get_asset_by_id": (db.get_asset_by_id, _id, guild_id),
+        "get_accepted_asset_by_id": (db.get_accepted_asset_by_id, _id, guild_id),
+        "get_accepted_assets_by_ids": (db.get_accepted_assets_by_ids, sample["ids"], guild_id),
+        "get_queue": (db.get_queue, guild_id, 10, sample["after"]),
+        "get_guild_asset_by_id": (db.get_guild_asset_by_id, _id, guild_id),
+        "get_assets_contain_name": (db.get_assets_contain_name, guild_id, "asset1", 10, (2, *sample["after"])),
+        "get_assets_by_type": (db.get_assets_by_type, guild_id, "skin", 10, sample["after"]),
+        "list_assets": (db.list_assets, {"guildID": guild_id, "accepted": True}, 10),
+        "set_channel": (db.set_channel, guild_id, "1", "skin"),
+        "link_msg_id": (db.link_msg_id, db.database["discordAssets"].find_one()["_id"], "1", "1"),
+        "find_assets_to_bulk": (db.find_assets_to_bulk, {"guildID": guild_id, "accepted": False}, None, "skin", 10),
+        "get_guild_channels": (db.get_guild_channels, guild_id),
+        "link_msg_ids": (db.link_msg_ids, [(db.database["discordAssets"].find_one()["_id"], "1", "1")]),
+        "accept_assets": (db.accept_assets, guild_id, sample["ids"]),
+        "remove_assets": (db.remove_assets, guild_id, None, "skin", 5)
+    }
+
+def stages(plan: object) -> list:
+    """
+        Returns every stage name of an explain plan
+    """
+
+    ret = []
+
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            ret.append(plan["stage"])
+
+        for value in plan.values():
+            ret += stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            ret += stages(value)
+
+    return ret
+
+def main(args: argparse.Namespace) -> int:
+    recorder = CommandRecorder()
+    db = TwUtilsDB(args.database, event_listeners=[recorder])
+    sample = seed(db, args.assets)
+    table = calls(db, sample)
+    failed = False
+
+    methods = {
+        name for name, _ in inspect.getmembers(TwUtilsDB, inspect.isfunction)
+        if not name.startswith("_")
+    }
+
+    for name in sorted(methods - NOT_QUERIES - table.keys()):
+        print(f"[!] {name} is not covered")
+        failed = True
+
+    for name, (method, *method_args) in table.items():
+        recorder.commands = []
+        recorder.recording = True
+        method(*method_args)
+        recorder.recording = False
+
+        for command in recorder.commands:
+            explain = db.database.command(
+                {
+                    "explain": command,
+                    "verbosity": "queryPlanner"
+                }
+            )
+            plan = stages(explain["queryPlanner"]["winningPlan"])
+            bad = FORBIDDEN_STAGES.intersection(plan)
+            failed |= bool(bad)
+
+            print(f"[{'-' if bad else '+'}] {name}: {' <- '.join(plan)}")
+
+    if not args.keep:
+        db.client.drop_database(args.database)
+
+    return int(failed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", default="twutils_explain")
+    parser.add_argument("--assets", type=int, default=2000)
+    parser.add_argument("--keep", action="store_true")
+
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,59 @@
+"""
+    Adds the name search grams (nameGrams) to the assets inserted before
+    !findname was served from them. The assets inserted since then already
+    have them, it only has to run once.
+
+    usage: python -m tools.migrate_name_grams [--dry-run] [--batch-size 500]
+"""
+
+import argparse
+import sys
+
+from pymongo import UpdateOne
+
+from utils.database import TwUtilsDB, name_grams
+
+def main(args: argparse.Namespace) -> int:
+    db = TwUtilsDB()
+    collection = db.database["discordAssets"]
+    cursor = collection.find(
+        {
+            "nameGrams": {
+                "$exists": False
+            }
+        },
+        {"assetName": 1}
+    )
+    requests = []
+    updated = 0
+
+    for doc in cursor:
+        requests.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"nameGrams": name_grams(doc["assetName"])}}
+            )
+        )
+
+        if len(requests) >= args.batch_size:
+            if not args.dry_run:
+                collection.bulk_write(requests, ordered=False)
+
+            updated += len(requests)
+            requests = []
+
+    if requests and not args.dry_run:
+        collection.bulk_write(requests, ordered=False)
+
+    updated += len(requests)
+
+    print(f"{updated} assets {'to update' if args.dry_run else 'updated'}")
+
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=500)
+
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,144 @@
+"""
+    Moves the assets from the flat storage layout (<uuid>.png) to the
+    content addressed one (ab/cd/<checksum>.png)
+
+    The documents sharing a checksum are pointed to the same file, the
+    other copies are removed once every document has been updated, so an
+    interrupted run can be started again. The files whose content does not
+    match the document checksum are reported and left untouched. The former
+    Redis checksum -> path keys are deleted.
+
+    usage: python -m tools.migrate_storage [--dry-run] [--keep-redis]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+
+from typing import List, Union
+
+from pymongo import UpdateMany
+
+from utils.cache import Cache
+from utils.database import TwUtilsDB
+from utils.storage import asset_path, remove_asset, replace_file
+
+def file_checksum(path: str) -> str:
+    """
+        Returns the MD5 checksum of a file
+    """
+
+    md5 = hashlib.md5()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            md5.update(chunk)
+
+    return md5.hexdigest()
+
+def group_by_checksum(db: TwUtilsDB) -> dict:
+    """
+        Returns checksum -> set of the stored paths
+    """
+
+    ret = {}
+    cursor = db.database["discordAssets"].find(
+        {},
+        {"checksum": 1, "path": 1}
+    )
+
+    for doc in cursor:
+        ret.setdefault(doc["checksum"], set()).add(doc["path"])
+
+    return ret
+
+def migrate(checksum: str, paths: set, dry_run: bool) -> Union[List[str], None]:
+    """
+        Copies one asset to its new path, returns the former copies
+        to remove or None if no valid file has been found
+    """
+
+    target = asset_path(checksum)
+    sources = [
+        path for path in paths
+        if path != target and os.path.exists(path)
+    ]
+
+    if not os.path.exists(target):
+        source = None
+
+        for path in sources:
+            if file_checksum(path) == checksum:
+                source = path
+                break
+
+            print(f"[!] {path} does not match {checksum}")
+
+        if not source:
+            return None
+
+        print(f"[+] {source} -> {target}")
+
+        if not dry_run:
+            with open(source, "rb") as f:
+                replace_file(target, f.read())
+
+    return [path for path in sources if file_checksum(path) == checksum]
+
+def main(args: argparse.Namespace) -> int:
+    db = TwUtilsDB()
+    groups = group_by_checksum(db)
+    updates = []
+    copies = []
+    missing = 0
+
+    for checksum, paths in groups.items():
+        sources = migrate(checksum, paths, args.dry_run)
+
+        if sources is None:
+            print(f"[-] {checksum}: no file for {', '.join(sorted(paths))}")
+            missing += 1
+            continue
+
+        copies += sources
+
+        updates.append(
+            UpdateMany(
+                {"checksum": checksum},
+                {
+                    # The preview is recorded again on the next view
+                    "$set": {"path": asset_path(checksum)},
+                    "$unset": {"previewPath": ""}
+                }
+            )
+        )
+
+    if args.dry_run:
+        print(f"{len(updates)} assets to migrate, {len(copies)} copies to remove, {missing} missing")
+
+        return int(bool(missing))
+
+    if updates:
+        db.database["discordAssets"].bulk_write(updates, ordered=False)
+
+    # Every document uses its new path now
+    for path in copies:
+        remove_asset(path)
+
+    if not args.keep_redis:
+        cache = Cache()
+
+        for checksum in groups.keys():
+            cache.delete(checksum)
+
+    print(f"{len(updates)} assets migrated, {missing} missing")
+
+    return int(bool(missing))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--keep-redis", action="store_true")
+
+    sys.exit(main(parser.parse_args()))
@@ -11,12 +11,12 @@ class Cache(Redis):
         Used to avoid useless asset download
     """
 
-    def __init__(self, db: int=0):
+    def __init__(self, db: int=0, decode: bool=True):
         super().__init__(
             host=CONFIG.get_var("REDIS", "HOST"),
             password=CONFIG.get_var("REDIS", "PASSWORD"),
             port=CONFIG.get_var("REDIS", "PORT"),
             db=db,
             charset="utf-8",
-            decode_responses=True
+            decode_responses=decode
         )
@@ -1,23 +1,93 @@
 """database controller"""
 
+import asyncio
+import functools
 import logging
 import pymongo
 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from sys import stderr
-from typing import Dict, Union, List
+from typing import Any, Callable, Dict, Tuple, Union, List
 from bson import ObjectId
 
 from utils.config import DockerConfig
-from cogs.data.collection import ASSET_COLLECTION, CHANNEL_COLLECTION
+from cogs.data.collection import (
+    ASSET_COLLECTION,
+    ASSET_INDEXES,
+    CHANNEL_COLLECTION,
+    CHANNEL_INDEXES
+)
 
 LOG = logging.getLogger(__name__)
 CONFIG = DockerConfig("config.ini")
 
 DBCONFIG = {
     "url":     CONFIG.get_var("MONGODB", "URL"),
-    "database": CONFIG.get_var("MONGODB", "DB_NAME")
+    "database": CONFIG.get_var("MONGODB", "DB_NAME"),
+    "pool_size": int(CONFIG.get_var("MONGODB", "POOL_SIZE") or 16),
+    "init_schema": (CONFIG.get_var("MONGODB", "INIT_SCHEMA") or "true").lower() == "true"
 }
 
+NAME_GRAM_SIZE = 3
+NAME_MAX_LENGTH = 64
+
+# Name search candidates read per query when a rank is paged
+NAME_SCAN_BATCH = 100
+
+# Listings only need these fields, sorted with a unique key
+LISTING_PROJECTION = ["assetName", "authorName", "type", "createdAt"]
+LISTING_SORT = [("createdAt", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+
+def name_grams(name: str, size: int=None) -> List[str]:
+    """
+        Returns the lowercase n-grams of a name, every length
+        up to NAME_GRAM_SIZE, or only [size] long ones
+    """
+
+    name = name.lower()
+    sizes = [size] if size else range(1, NAME_GRAM_SIZE + 1)
+    ret = set()
+
+    for n in sizes:
+        ret.update(name[i:i + n] for i in range(len(name) - n + 1))
+
+    return sorted(ret)
+
+def name_rank(asset_name: str, name: str) -> int:
+    """
+        Search rank: exact match, prefix match, then substring match
+    """
+
+    asset_name = asset_name.lower()
+
+    if asset_name == name:
+        return 0
+    if asset_name.startswith(name):
+        return 1
+
+    return 2
+
+def listing_key(doc: dict) -> tuple:
+    """
+        Returns the key of the listing page following doc,
+        (createdAt, _id) prefixed by the name search rank if any
+    """
+
+    key = (doc["createdAt"], doc["_id"])
+
+    if "nameRank" in doc:
+        return (doc["nameRank"], *key)
+
+    return key
+
+def object_ids(ids: List[str]) -> List[ObjectId]:
+    """
+        Returns the valid ids as ObjectId, the other ones are ignored
+    """
+
+    return [ObjectId(_id) for _id in ids if ObjectId.is_valid(_id)]
+
 class MongoDriver:
     """
         This class contains some basics MongoDB features
@@ -25,9 +95,11 @@ class MongoDriver:
         It represents a connection to a database
     """
 
-    def __init__(self):
+    def __init__(self, **client_options: dict):
         self.client = pymongo.MongoClient(
-            DBCONFIG["url"]
+            DBCONFIG["url"],
+            maxPoolSize=DBCONFIG["pool_size"],
+            **client_options
         )
         
         self.database = None
@@ -38,17 +110,29 @@ class MongoDriver:
 
     def init_collection(self, name: str, schema: dict):
         """
-            Add a collection to the database
+            Add a collection to the database, an existing one
+            gets the current schema
         """
 
         try:
-            self.database.create_collection(
-                name,
-                validator=schema
-            )
+            if name in self.database.list_collection_names():
+                self.database.command("collMod", name, validator=schema)
+            else:
+                self.database.create_collection(
+                    name,
+                    validator=schema
+                )
         except Exception as error:
             print(error, file=stderr)
     
+    def init_indexes(self, name: str, indexes: list):
+        """
+            Creates the (keys, options) indexes of a collection
+        """
+
+        for keys, options in indexes:
+            self.database[name].create_index(keys, **options)
+
     def init_collections(self, name: str, collection: dict):
         """
             Method prototype
@@ -71,37 +155,25 @@ class TwUtilsDB(MongoDriver):
         for Teeworlds Utilities
     """
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, database: str="twutils", **client_options: dict):
+        super().__init__(**client_options)
+
+        # twutils database
+        self.set_database(database)
 
-        self.init_collections()
-    
     def init_collections(self):
         """
-            Initializes the collections schemas
+            Initializes the collections schemas and indexes,
+            it only has to run once, at startup
         """
 
-        # twutils database
-        self.set_database("twutils")
-
         # twutils collections
         self.init_collection("discordAssets", ASSET_COLLECTION)
-        self.database["discordAssets"].create_index(
-            [
-                ("guildID", pymongo.ASCENDING),
-                ("checksum", pymongo.ASCENDING)
-            ],
-                unique=True
-        )
+        self.init_indexes("discordAssets", ASSET_INDEXES)
 
         self.init_collection("discordChannels", CHANNEL_COLLECTION)
-        self.database["discordChannels"].create_index(
-            [
-                ("guildID", pymongo.ASCENDING)
-            ],
-                unique=True
-        )
-    
+        self.init_indexes("discordChannels", CHANNEL_INDEXES)
+
     def duplicate(
         self,
         checksum: str,
@@ -137,12 +209,184 @@ class TwUtilsDB(MongoDriver):
 
         return ret
 
+    def find_by_pixel_hash(
+        self,
+        pixel_hash: str,
+        guild_id: str
+    ) -> Union[Dict, None]:
+        """
+            Checks if an asset with the same decoded
+            pixels exists in the guild (accepted or not)
+        """
+
+        ret = self.database["discordAssets"].find_one(
+            {
+                "guildID": guild_id,
+                "pixelHash": pixel_hash
+            },
+            {"_id": 1}
+        )
+
+        return ret
+
+    def get_phashes(self, guild_id: str) -> List[Dict]:
+        """
+            Returns the _id and perceptual hash of every
+            guild asset that has one
+        """
+
+        cursor = self.database["discordAssets"].find(
+            {
+                "guildID": guild_id,
+                "phash": {
+                    "$exists": True
+                }
+            },
+            {"_id": 1, "phash": 1}
+        )
+
+        return list(cursor)
+
+    def get_existing_checksums(self, checksums: List[str]) -> set:
+        """
+            Returns the checksums used by at least one asset
+        """
+
+        cursor = self.database["discordAssets"].find(
+            {
+                "checksum": {
+                    "$in": checksums
+                }
+            },
+            {"_id": 0, "checksum": 1}
+        )
+
+        return set(doc["checksum"] for doc in cursor)
+
+    def scan_assets(self, after: ObjectId=None, limit: int=500) -> List[Dict]:
+        """
+            Returns the file fields of the assets, in _id order
+            starting after the given _id
+        """
+
+        query = {}
+
+        if after:
+            query["_id"] = {"$gt": after}
+
+        cursor = self.database["discordAssets"].find(
+            query,
+            {
+                "path": 1,
+                "checksum": 1,
+                "storedChecksum": 1,
+                "pixelHash": 1,
+                "phash": 1
+            }
+        ).sort("_id", pymongo.ASCENDING).limit(limit)
+
+        return list(cursor)
+
+    def get_unoptimized_assets(self, limit: int=50) -> List[Dict]:
+        """
+            Returns the checksum and path of assets
+            whose file has not been optimized yet
+        """
+
+        cursor = self.database["discordAssets"].find(
+            {
+                "storedChecksum": {
+                    "$exists": False
+                }
+            },
+            {"checksum": 1, "path": 1}
+        ).limit(limit)
+
+        return list(cursor)
+
+    def set_stored_checksum(
+        self,
+        checksum: str,
+        stored_checksum: str,
+        saved_bytes: int
+    ):
+        """
+            Records the optimized file on every asset using it
+            that has not been optimized yet
+        """
+
+        self.database["discordAssets"].update_many(
+            {
+                "checksum": checksum,
+                "storedChecksum": {
+                    "$exists": False
+                }
+            }, {
+                "$set": {
+                    "storedChecksum": stored_checksum,
+                    "savedBytes": saved_bytes
+                }
+            }
+        )
+
+    def set_preview_path(self, checksum: str, preview_path: str):
+        """
+            Records the preview on every asset using the file
+            that does not have one yet
+        """
+
+        self.database["discordAssets"].update_many(
+            {
+                "checksum": checksum,
+                "previewPath": {
+                    "$exists": False
+                }
+            }, {
+                "$set": {
+                    "previewPath": preview_path
+                }
+            }
+        )
+
+    def is_stored_checksum(self, checksum: str, stored_checksum: str) -> bool:
+        """
+            Checks if an asset file has been optimized into stored_checksum
+        """
+
+        ret = self.database["discordAssets"].find_one(
+            {
+                "storedChecksum": stored_checksum,
+                "checksum": checksum
+            },
+            {"_id": 1}
+        )
+
+        return ret is not None
+
+    def update_assets(self, updates: Dict[ObjectId, dict]):
+        """
+            Sets fields of many assets in one bulk write
+            (_id -> fields)
+        """
+
+        requests = [
+            pymongo.UpdateOne({"_id": _id}, {"$set": fields})
+            for _id, fields in updates.items()
+        ]
+
+        if requests:
+            self.database["discordAssets"].bulk_write(requests, ordered=False)
+
     def add_to_queue(self, fields: dict) -> Union[Dict, None]:
         """
             Adds asset informations to the queue
         """
 
         ret = None
+        fields = {
+            **fields,
+            "nameGrams": name_grams(fields["assetName"])
+        }
 
         try:
             ret = self.database["discordAssets"].insert_one(fields)
@@ -151,29 +395,135 @@ class TwUtilsDB(MongoDriver):
 
         return ret
 
-    def accept(self, _id: str, guild_id: str) -> Union[Dict, None]:
+    def find_assets_to_bulk(
+        self,
+        query: dict,
+        ids: List[str]=None,
+        _type: str=None,
+        limit: int=0
+    ) -> List[Dict]:
+        """
+            Returns the assets matching query and the ids, or query and
+            the type (oldest first)
+        """
+
+        query = dict(query)
+        cursor = self.database["discordAssets"]
+
+        if ids is not None:
+            query["_id"] = {"$in": object_ids(ids)}
+            cursor = cursor.find(query)
+        else:
+            query["type"] = _type
+            cursor = cursor.find(query).sort(
+                [("createdAt", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]
+            )
+
+        return list(cursor.limit(limit))
+
+    def accept_assets(
+        self,
+        guild_id: str,
+        ids: List[str]=None,
+        _type: str=None,
+        limit: int=0
+    ) -> List[Dict]:
         """
-            Accept an asset for a specific Discord guild
+            Accepts the queued assets of a guild with the ids (or the type)
+            in one write and returns the documents it has accepted
+
+            The write tags the documents with a batch id, so an asset
+            accepted meanwhile by another call is not returned twice
         """
 
-        try:
-            ret = self.database["discordAssets"].find_one_and_update(
+        docs = self.find_assets_to_bulk(
+            {"guildID": guild_id, "accepted": False},
+            ids,
+            _type,
+            limit
+        )
+
+        if not docs:
+            return []
+
+        ids = [doc["_id"] for doc in docs]
+        batch = ObjectId()
+
+        self.database["discordAssets"].update_many(
+            {
+                "_id": {"$in": ids},
+                "accepted": False
+            }, {
+                "$set": {
+                    "accepted": True,
+                    "acceptBatch": batch
+                }
+            }
+        )
+
+        return list(
+            self.database["discordAssets"].find(
                 {
-                    "_id": ObjectId(_id),
-                    "guildID": guild_id,
-                    "accepted": False
-                }, {
-                    "$set": {
-                        "accepted": True
-                    }
-                },
-                return_document=pymongo.ReturnDocument.AFTER
-            )
-        except:
-            return None
+                    "_id": {"$in": ids},
+                    "acceptBatch": batch
+                }
+            ).sort([("createdAt", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+        )
+
+    def remove_assets(
+        self,
+        guild_id: str,
+        ids: List[str]=None,
+        _type: str=None,
+        limit: int=0
+    ) -> List[Dict]:
+        """
+            Removes the guild assets with the ids (any state) or the
+            queued ones of the type and returns the documents it
+            has removed
+
+            The documents are tagged with a batch id before the delete,
+            so an asset removed (or accepted) meanwhile by another call
+            is not returned
+        """
+
+        query = {"guildID": guild_id}
+
+        if ids is None:
+            query["accepted"] = False
+
+        docs = self.find_assets_to_bulk(query, ids, _type, limit)
+
+        if not docs:
+            return []
+
+        ids = [doc["_id"] for doc in docs]
+        batch = ObjectId()
+
+        self.database["discordAssets"].update_many(
+            {
+                **query,
+                "_id": {"$in": ids},
+                "removeBatch": {
+                    "$exists": False
+                }
+            }, {
+                "$set": {
+                    "removeBatch": batch
+                }
+            }
+        )
+
+        query = {
+            "_id": {"$in": ids},
+            "removeBatch": batch
+        }
+        docs = list(self.database["discordAssets"].find(query))
+
+        self.database["discordAssets"].delete_many(query)
+
+        return docs
 
-        return ret
-        
     def get_asset_by_id(self, _id: str, guild_id: str) -> Union[Dict, None]:
         """
             Return an asset document with his _id
@@ -209,22 +559,52 @@ class TwUtilsDB(MongoDriver):
 
         return ret
     
-    def get_queue(self, guild_id: str) -> Union[List, None]:
+    def get_accepted_assets_by_ids(
+        self,
+        ids: List[str],
+        guild_id: str
+    ) -> Union[List, None]:
         """
-            Return every assets in the queue
+            Return the accepted asset documents matching the ids
+            (invalid ids are ignored)
         """
 
+        ids = [ObjectId(_id) for _id in ids if ObjectId.is_valid(_id)]
+
         try:
             ret = self.database["discordAssets"].find(
                 {
+                    "_id": {
+                        "$in": ids
+                    },
                     "guildID": guild_id,
-                    "accepted": False
+                    "accepted": True
                 }
-            ).sort("createdAt", -1)
+            )
         except Exception:
             return None
 
         return list(ret)
+
+    def get_queue(
+        self,
+        guild_id: str,
+        limit: int=0,
+        after: Tuple[datetime, ObjectId]=None
+    ) -> Union[List, None]:
+        """
+            Return the assets in the queue (listing fields only),
+            newest first, one page at a time if limit is set
+        """
+
+        return self.list_assets(
+            {
+                "guildID": guild_id,
+                "accepted": False
+            },
+            limit,
+            after
+        )
     
     def get_guild_asset_by_id(self, _id: str, guild_id: str) -> Union[Dict, None]:
         """
@@ -271,23 +651,22 @@ class TwUtilsDB(MongoDriver):
 
         return ret
     
-    def remove_asset_by_id(self, _id: str, guild_id: str) -> Union[Dict, None]:
+    def link_msg_ids(self, links: List[Tuple[ObjectId, str, str]]):
         """
-            Remove asset document for a specific Discord guild
+            Archives many assets in one bulk write,
+            links are (_id, message id, channel id)
         """
 
-        try:
-            ret = self.database["discordAssets"].find_one_and_delete(
-                {
-                    "_id": ObjectId(_id),
-                    "guildID": guild_id
-                }, 
-                return_document=pymongo.ReturnDocument.BEFORE
+        requests = [
+            pymongo.UpdateOne(
+                {"_id": _id},
+                {"$set": {"discord_msg_id": msg_id, "discord_channel_id": channel_id}}
             )
-        except:
-            return None
+            for _id, msg_id, channel_id in links
+        ]
 
-        return ret
+        if requests:
+            self.database["discordAssets"].bulk_write(requests, ordered=False)
 
     def add_guild(self, fields: dict) -> Union[Dict, None]:
         """
@@ -329,73 +708,194 @@ class TwUtilsDB(MongoDriver):
 
         return ret
 
-    def get_channels(
-        self,
-        guild_id: str,
-        category: str
-    ) -> Union[Dict, None]:
+    def get_guild_channels(self, guild_id: str) -> Union[Dict, None]:
         """
-            Returns a channel ID for category with a guild ID + category name
+            Returns the channels of every category of a guild
         """
 
-        try:
-            ret = self.database["discordChannels"].find_one(
-                {
-                    "guildID": guild_id,
-                    category: {
-                        "$exists": True
-                    }
-                },
-            )
-        except Exception:
-            return None
+        return self.database["discordChannels"].find_one(
+            {
+                "guildID": guild_id
+            }
+        )
 
-        return ret
-    
-    def get_assets_contain_name(
+    def list_assets(
         self,
-        guild_id: str,
-        name: str
+        query: dict,
+        limit: int=0,
+        after: Tuple[datetime, ObjectId]=None
     ) -> Union[List, None]:
         """
-            Returns every asset containing the subtring [name] in their name
+            Returns the listing fields of the assets matching query,
+            newest first, starting after the (createdAt, _id) key
         """
 
+        if after:
+            created_at, _id = after
+            query = {
+                **query,
+                "createdAt": {
+                    "$lte": created_at
+                },
+                "$or": [
+                    {"createdAt": {"$lt": created_at}},
+                    {"_id": {"$lt": _id}}
+                ]
+            }
+
         try:
             ret = self.database["discordAssets"].find(
-                {
-                    "guildID": guild_id,
-                    "assetName": {
-                        "$regex": name
-                    },
-                    "accepted": True
-                }
-            ).sort("createdAt", -1)
+                query,
+                LISTING_PROJECTION
+            ).sort(LISTING_SORT).limit(limit)
+
+            return list(ret)
         except Exception as error:
             print(error, file=stderr)
             return None
 
-        return list(ret)
+    def get_assets_contain_name(
+        self,
+        guild_id: str,
+        name: str,
+        limit: int=0,
+        after: Tuple[int, datetime, ObjectId]=None
+    ) -> Union[List, None]:
+        """
+            Returns the assets containing the subtring [name] in their name
+            (case insensitive), the exact matches first, then the prefix
+            matches, newest first within a rank
+
+            With a limit, the ranks are paged one after the other starting
+            after the (rank, createdAt, _id) key, every document has its
+            nameRank
+        """
+
+        name = name.lower()[:NAME_MAX_LENGTH]
+
+        # Short names are stored as grams, longer ones need every trigram
+        if len(name) <= NAME_GRAM_SIZE:
+            grams = [name]
+        else:
+            grams = name_grams(name, NAME_GRAM_SIZE)
+
+        query = {
+            "guildID": guild_id,
+            "accepted": True,
+            "nameGrams": {
+                "$all": grams
+            }
+        }
+
+        def matches(docs: List[dict], ranks: range) -> List[dict]:
+            # The grams can match a name without the substring
+            ret = []
+
+            for doc in docs:
+                if name not in doc["assetName"].lower():
+                    continue
+
+                doc["nameRank"] = name_rank(doc["assetName"], name)
+
+                if doc["nameRank"] in ranks:
+                    ret.append(doc)
+
+            return ret
+
+        if not limit:
+            docs = self.list_assets(query)
+
+            if docs is None:
+                return None
+
+            return sorted(matches(docs, range(3)), key=lambda doc: doc["nameRank"])
+
+        rank, key = 0, None
+
+        if after:
+            rank, key = after[0], tuple(after[1:])
+
+        batch_size = max(limit, NAME_SCAN_BATCH)
+        ret = []
+
+        # Every rank scans the candidates, a page is completed
+        # with the next candidates, then with the next rank
+        while rank < 3:
+            docs = self.list_assets(query, batch_size, key)
+
+            if docs is None:
+                return None
+
+            ret += matches(docs, range(rank, rank + 1))
+
+            if len(ret) >= limit:
+                break
+
+            if len(docs) < batch_size:
+                rank, key = rank + 1, None
+            else:
+                key = (docs[-1]["createdAt"], docs[-1]["_id"])
+
+        return ret[:limit]
 
     def get_assets_by_type(
         self,
         guild_id: str,
-        _type: str
+        _type: str,
+        limit: int=0,
+        after: Tuple[datetime, ObjectId]=None
     ) -> Union[List, None]:
         """
-            Returns every asset of type [_type]
+            Returns the assets of type [_type] (listing fields only),
+            newest first, one page at a time if limit is set
         """
 
-        try:
-            ret = self.database["discordAssets"].find(
-                {
-                    "guildID": guild_id,
-                    "type": _type,
-                    "accepted": True
-                }
-            ).sort("createdAt", -1)
-        except Exception:
-            return None
+        return self.list_assets(
+            {
+                "guildID": guild_id,
+                "type": _type,
+                "accepted": True
+            },
+            limit,
+            after
+        )
 
-        return list(ret)
-    
\ No newline at end of file
+class AsyncTwUtilsDB:
+    """
+        Async variant of TwUtilsDB with the same methods,
+        the pymongo calls run in a thread pool so a slow query
+        does not block the event loop
+
+        TwUtilsDB stays the sync variant (scripts, tools)
+    """
+
+    def __init__(self, db: TwUtilsDB=None, workers: int=DBCONFIG["pool_size"]):
+        self.db = db or TwUtilsDB()
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="mongo"
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.db, name)
+
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        return self.wrap(attr)
+
+    def wrap(self, func: Callable) -> Callable:
+        """
+            Returns a coroutine function running func in the thread pool
+        """
+
+        @functools.wraps(func)
+        async def call(*args: list, **kwargs: dict) -> Any:
+            loop = asyncio.get_event_loop()
+
+            return await loop.run_in_executor(
+                self.executor,
+                functools.partial(func, *args, **kwargs)
+            )
+
+        return call
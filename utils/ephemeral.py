@@ -0,0 +1,173 @@
+"""ephemeral state module"""
+
+import asyncio
+import pickle
+import time
+
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from utils.cache import Cache
+from utils.config import DockerConfig
+
+CONFIG = DockerConfig("config.ini")
+
+BACKEND = CONFIG.get_var("EPHEMERAL", "BACKEND") or "memory"
+
+class MemoryStore:
+    """
+        In memory key -> value store, every entry expires after ttl
+        seconds and the least recently used ones are evicted above max_size
+    """
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Any:
+        """
+            Returns the value or None if it is missing or expired
+        """
+
+        entry = self.entries.get(key)
+
+        if not entry:
+            return None
+
+        expires_at, value = entry
+
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """
+            Stores the value, its ttl starts again
+        """
+
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """
+            Removes the value if it exists
+        """
+
+        self.entries.pop(key, None)
+
+class RedisStore:
+    """
+        Redis key -> value store with the same behaviour as MemoryStore,
+        the values are pickled so they survive a restart
+    """
+
+    def __init__(self, namespace: str, ttl: int, max_size: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.redis = Cache(decode=False)
+
+        # Access times, to evict the least recently used keys
+        self.lru = f"{namespace}:lru"
+
+    def __len__(self) -> int:
+        return self.redis.zcard(self.lru)
+
+    def name(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: Hashable) -> Any:
+        """
+            Returns the value or None if it is missing or expired
+        """
+
+        value = self.redis.get(self.name(key))
+
+        if value is None:
+            self.redis.zrem(self.lru, str(key))
+            return None
+
+        self.redis.zadd(self.lru, {str(key): time.time()})
+
+        return pickle.loads(value)
+
+    def set(self, key: Hashable, value: Any):
+        """
+            Stores the value, its ttl starts again
+        """
+
+        pipe = self.redis.pipeline()
+        pipe.set(self.name(key), pickle.dumps(value), ex=self.ttl)
+        pipe.zadd(self.lru, {str(key): time.time()})
+        pipe.zcard(self.lru)
+        size = pipe.execute()[-1]
+
+        if size <= self.max_size:
+            return
+
+        for old_key, _ in self.redis.zpopmin(self.lru, size - self.max_size):
+            self.redis.delete(self.name(old_key.decode()))
+
+    def delete(self, key: Hashable):
+        """
+            Removes the value if it exists
+        """
+
+        pipe = self.redis.pipeline()
+        pipe.delete(self.name(key))
+        pipe.zrem(self.lru, str(key))
+        pipe.execute()
+
+class AsyncStore:
+    """
+        Async access to a store, the Redis calls run in a thread pool
+        so they do not block the event loop (the memory ones do not
+        need it)
+    """
+
+    def __init__(self, store: object):
+        self.store = store
+        self.blocking = isinstance(store, RedisStore)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    async def run(self, func: callable, *args: list) -> Any:
+        if not self.blocking:
+            return func(*args)
+
+        loop = asyncio.get_event_loop()
+
+        return await loop.run_in_executor(None, func, *args)
+
+    async def get(self, key: Hashable) -> Any:
+        return await self.run(self.store.get, key)
+
+    async def set(self, key: Hashable, value: Any):
+        await self.run(self.store.set, key, value)
+
+    async def delete(self, key: Hashable):
+        await self.run(self.store.delete, key)
+
+def create_store(namespace: str, ttl: int, max_size: int) -> AsyncStore:
+    """
+        Returns an async store using the configured backend
+        ([EPHEMERAL] BACKEND)
+    """
+
+    if BACKEND == "redis":
+        return AsyncStore(RedisStore(namespace, ttl, max_size))
+
+    return AsyncStore(MemoryStore(ttl, max_size))
@@ -0,0 +1,144 @@
+"""image executor module"""
+
+import asyncio
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Tuple
+
+def available_cores() -> int:
+    """
+        Returns the number of cores the process is allowed to use
+    """
+
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
+
+def timed_call(func: Callable, args: tuple) -> Tuple[float, float, Any]:
+    """
+        Runs func in the worker and returns (start, end, result)
+    """
+
+    start = time.time()
+    ret = func(*args)
+
+    return start, time.time(), ret
+
+class ImageExecutor:
+    """
+        Process pool shared by the CPU bound image work (decoding,
+        hashing, rendering, compositing), so a big image never holds
+        the event loop or the GIL of the bot process
+
+        The functions and their arguments must be picklable
+        (module level functions, bytes, str...)
+    """
+
+    def __init__(self, workers: int=0):
+        self.workers = workers or available_cores()
+        self.pool = None
+
+        self.jobs = 0
+        self.pending = 0
+        self.failed = 0
+        self.restarts = 0
+        self.wait_total = 0
+        self.wait_max = 0
+        self.exec_total = 0
+        self.exec_max = 0
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        """
+            Returns the pool, the workers are started on first use
+        """
+
+        if not self.pool:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        return self.pool
+
+    def drop_pool(self, pool: ProcessPoolExecutor):
+        """
+            Forgets a broken pool (a worker died), the next job
+            starts a new one
+        """
+
+        if self.pool is not pool:
+            return
+
+        self.pool = None
+        self.restarts += 1
+        pool.shutdown(wait=False)
+
+    def shutdown(self):
+        """
+            Stops the workers once their current jobs are done
+            (blocking, run it outside of the event loop)
+        """
+
+        if self.pool:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    async def run(self, func: Callable, *args: list) -> Any:
+        """
+            Runs func(*args) in a worker process
+        """
+
+        loop = asyncio.get_event_loop()
+        submitted = time.time()
+        pool = self.get_pool()
+        self.pending += 1
+
+        try:
+            start, end, ret = await loop.run_in_executor(
+                pool,
+                timed_call,
+                func,
+                args
+            )
+        except BrokenProcessPool:
+            # Every job of the pool fails, the following ones
+            # get a new pool
+            self.failed += 1
+            self.drop_pool(pool)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+
+        wait = start - submitted
+        duration = end - start
+
+        self.jobs += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.exec_total += duration
+        self.exec_max = max(self.exec_max, duration)
+
+        return ret
+
+    def stats(self) -> Dict[str, int]:
+        """
+            Returns the executor counters (times in ms)
+        """
+
+        jobs = self.jobs or 1
+
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "jobs": self.jobs,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "wait_avg_ms": round(self.wait_total / jobs * 1000, 1),
+            "wait_max_ms": round(self.wait_max * 1000, 1),
+            "exec_avg_ms": round(self.exec_total / jobs * 1000, 1),
+            "exec_max_ms": round(self.exec_max * 1000, 1)
+        }
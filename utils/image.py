@@ -0,0 +1,165 @@
+"""image utilities module"""
+
+import hashlib
+import io
+import math
+import numpy as np
+
+from PIL import Image, ImageDraw, ImageFont
+from typing import List, Tuple, Union
+
+# dHash side, the hash has PHASH_SIZE * PHASH_SIZE bits
+PHASH_SIZE = 8
+
+# Colors of the palette previews
+PREVIEW_COLORS = 256
+
+def contact_sheet(
+    images: List[Tuple[str, bytes]],
+    padding: int=8,
+    label_height: int=16
+) -> bytes:
+    """
+        Composites (label, PNG) pairs into one labeled grid image
+        and returns it as PNG
+    """
+
+    decoded = [
+        (label, Image.open(io.BytesIO(content)).convert("RGBA"))
+        for label, content in images
+    ]
+
+    cell_w = max(img.width for _, img in decoded) + padding
+    cell_h = max(img.height for _, img in decoded) + padding + label_height
+    columns = math.ceil(math.sqrt(len(decoded)))
+    rows = math.ceil(len(decoded) / columns)
+
+    sheet = Image.new("RGBA", (columns * cell_w + padding, rows * cell_h + padding))
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default()
+
+    for i, (label, img) in enumerate(decoded):
+        x = padding + (i % columns) * cell_w
+        y = padding + (i // columns) * cell_h
+
+        # Centers the render in its cell
+        sheet.alpha_composite(
+            img,
+            (x + (cell_w - padding - img.width) // 2, y)
+        )
+
+        while label and draw.textlength(label, font=font) > cell_w - padding:
+            label = label[:-1]
+
+        text_w = draw.textlength(label, font=font)
+        draw.text(
+            (x + (cell_w - padding - text_w) // 2, y + cell_h - padding - label_height),
+            label,
+            fill=(255, 255, 255, 255),
+            font=font,
+            stroke_width=1,
+            stroke_fill=(0, 0, 0, 255)
+        )
+
+    ret = io.BytesIO()
+    sheet.save(ret, format="PNG")
+
+    return ret.getvalue()
+
+def dhash(img: Image.Image, size: int=PHASH_SIZE) -> str:
+    """
+        Returns the difference hash of an RGBA image in hex,
+        the transparent pixels are flattened on black
+    """
+
+    background = Image.new("RGBA", img.size, (0, 0, 0, 255))
+    gray = Image.alpha_composite(background, img).convert("L").resize(
+        (size + 1, size),
+        Image.BILINEAR
+    )
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = int("".join("1" if bit else "0" for bit in bits), 2)
+
+    return f"{value:0{size * size // 4}x}"
+
+def image_hashes(content: bytes) -> Tuple[str, str]:
+    """
+        Returns the pixel hash (SHA-1 of the size and decoded RGBA)
+        and the perceptual hash (dHash) of a PNG, both in hex
+    """
+
+    img = Image.open(io.BytesIO(content)).convert("RGBA")
+
+    pixels = hashlib.sha1(f"{img.width}x{img.height}".encode())
+    pixels.update(img.tobytes())
+
+    return pixels.hexdigest(), dhash(img)
+
+def make_preview(source: Union[str, bytes], max_size: int) -> Union[bytes, None]:
+    """
+        Returns a downscaled palette PNG fitting in max_size x max_size,
+        or None if the image (path or PNG bytes) already fits
+    """
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    # Only the header is read until the pixels are needed
+    img = Image.open(source)
+
+    if img.width <= max_size and img.height <= max_size:
+        return None
+
+    img = img.convert("RGBA")
+    img.thumbnail((max_size, max_size), Image.LANCZOS)
+    img = img.quantize(PREVIEW_COLORS, method=Image.FASTOCTREE)
+
+    ret = io.BytesIO()
+    img.save(ret, format="PNG", optimize=True)
+
+    return ret.getvalue()
+
+def optimize_png(content: bytes) -> Union[bytes, None]:
+    """
+        Returns a smaller PNG with exactly the same RGBA pixels, or None
+        if no candidate is smaller. The candidates drop the ancillary
+        chunks, recompress the image data and drop the alpha channel
+        or use a palette when it is lossless
+    """
+
+    img = Image.open(io.BytesIO(content)).convert("RGBA")
+    pixels = np.asarray(img)
+    candidates = [img]
+
+    if (pixels[:, :, 3] == 255).all():
+        candidates.append(img.convert("RGB"))
+
+    flat = pixels.reshape(-1, 4)
+    colors, indices = np.unique(flat, axis=0, return_inverse=True)
+
+    if len(colors) <= 256:
+        palette = Image.fromarray(
+            indices.reshape(pixels.shape[:2]).astype(np.uint8),
+            "P"
+        )
+        palette.putpalette(colors.flatten().tolist(), rawmode="RGBA")
+        candidates.append(palette)
+
+    ret = None
+
+    for candidate in candidates:
+        out = io.BytesIO()
+        candidate.save(out, format="PNG", optimize=True)
+        out = out.getvalue()
+
+        if len(out) >= len(ret or content):
+            continue
+
+        # Lossless or nothing
+        decoded = np.asarray(Image.open(io.BytesIO(out)).convert("RGBA"))
+
+        if np.array_equal(decoded, pixels):
+            ret = out
+
+    return ret
@@ -0,0 +1,146 @@
+"""upload ingest module"""
+
+import aiohttp
+import asyncio
+import hashlib
+import logging
+import struct
+
+from cogs.data.asset import is_size_valid
+from utils.utilities import signature_check
+
+log = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89\x50\x4e\x47\x0d\x0a\x1a\x0a"
+
+# Signature + IHDR length, type, width and height
+PNG_HEADER_SIZE = 24
+
+CHUNK_SIZE = 64 * 1024
+
+class IngestError(Exception):
+    """
+        The upload has been rejected, the message is sent to the user
+    """
+
+class Upload:
+    """
+        A downloaded and validated PNG
+    """
+
+    def __init__(self, content: bytes, checksum: str, width: int, height: int):
+        self.content = content
+        self.checksum = checksum
+        self.width = width
+        self.height = height
+
+    @property
+    def size(self) -> tuple:
+        return self.width, self.height
+
+def parse_png_header(data: bytes) -> tuple:
+    """
+        Returns the (width, height) of a PNG from its first 24 bytes
+    """
+
+    if not signature_check(data, PNG_SIGNATURE) or data[12:16] != b"IHDR":
+        raise IngestError("❌ Only PNGs are supported")
+
+    return struct.unpack(">II", data[16:PNG_HEADER_SIZE])
+
+class Ingest:
+    """
+        Streams Discord attachments, they are rejected as early as
+        possible: from the attachment metadata, then from the first bytes
+        and while downloading if they go over max_bytes
+
+        The MD5 checksum is computed while the chunks are received
+    """
+
+    def __init__(self, max_bytes: int, timeout: float=30):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.session = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+            Returns the download session, it is created on first use
+            because aiohttp needs a running event loop
+        """
+
+        if not self.session or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+        return self.session
+
+    async def close(self):
+        """
+            Closes the download session
+        """
+
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    def check_size(self, _type: str, width: int, height: int):
+        """
+            Raises an IngestError if the dimensions are not allowed
+        """
+
+        if not is_size_valid(_type, width, height):
+            raise IngestError("❌ Invalid asset")
+
+    def precheck(self, attachment: object, _type: str):
+        """
+            Rejects the attachment with the metadata sent by Discord
+        """
+
+        if attachment.size > self.max_bytes:
+            raise IngestError(
+                f"❌ The file is too large (max {self.max_bytes // 1024} KiB)"
+            )
+
+        # Discord only sets the dimensions of the images
+        if attachment.width is None or attachment.height is None:
+            raise IngestError("❌ Only PNGs are supported")
+
+        self.check_size(_type, attachment.width, attachment.height)
+
+    async def fetch(self, attachment: object, _type: str) -> Upload:
+        """
+            Downloads and validates the attachment
+        """
+
+        self.precheck(attachment, _type)
+
+        content = bytearray()
+        md5 = hashlib.md5()
+        size = None
+
+        try:
+            async with self.get_session().get(attachment.url) as resp:
+                if resp.status != 200:
+                    raise IngestError("❌ The attachment could not be downloaded")
+
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    content += chunk
+                    md5.update(chunk)
+
+                    if len(content) > self.max_bytes:
+                        raise IngestError(
+                            f"❌ The file is too large (max {self.max_bytes // 1024} KiB)"
+                        )
+
+                    # The real dimensions, the metadata could be wrong
+                    if not size and len(content) >= PNG_HEADER_SIZE:
+                        size = parse_png_header(content)
+                        self.check_size(_type, *size)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            log.warning(f"Attachment download failed: {error!r}")
+            raise IngestError("❌ The attachment could not be downloaded")
+
+        if not size:
+            raise IngestError("❌ Only PNGs are supported")
+
+        return Upload(bytes(content), md5.hexdigest(), *size)
@@ -2,27 +2,44 @@
 
 import discord
 
-from typing import Any, List, Union
+import logging
+
+from typing import Any, Callable, List, Tuple, Union
 from discord.ext import commands
 
 from utils.binds import Binds
+from utils.config import DockerConfig
+from utils.ephemeral import create_store
 from utils.reactions import Reactions, PageReaction
 from utils.utilities import make_groups
 
+log = logging.getLogger(__name__)
+CONFIG = DockerConfig("config.ini")
+
+PAGES_TTL = int(CONFIG.get_var("EPHEMERAL", "PAGES_TTL") or 3600)
+PAGES_MAX = int(CONFIG.get_var("EPHEMERAL", "PAGES_MAX") or 1000)
+
+# Message components only exist since discord.py 2.0
+PAGES_BACKEND = CONFIG.get_var("PAGES", "BACKEND") or "reactions"
+
+if PAGES_BACKEND == "buttons" and not hasattr(discord, "ui"):
+    log.warning("discord.py < 2.0 has no buttons, the pages use reactions")
+    PAGES_BACKEND = "reactions"
+
 class Page:
     """
         This object represents a page and stores
         useful informations to interact with the Discord message
+
+        It only holds plain data, so it can be kept in Redis
     """
 
     def __init__(
             self,
-            message: commands.Context,
             author_id: int,
             content: List[List[str]],
             lines_per_page: int = 10
         ):
-        self.message = message
         self.author_id = author_id
         self.content = content
         self.lines_per_page = lines_per_page
@@ -49,44 +66,116 @@ class Page:
 
         return True
 
-    def move(self, n: int) -> bool:
+    async def move(self, n: int, fetch: Callable=None) -> bool:
         """
             Moves index of n pages        
         """
 
         return self.set_index(self.index + n)
-    
-    async def edit(self):
+
+    def count(self) -> str:
         """
-            Edits the Discord message
+            Returns the displayed page count
+        """
+
+        return str(len(self.content))
+
+    def render(self) -> str:
+        """
+            Returns the message content of the current page
         """
 
         page_str_content = "\n".join(self.content[self.index])
 
-        msg = "```" + page_str_content + "\n" + \
-        f"page {self.index + 1} / {len(self.content)}" + "```"
+        return "```" + page_str_content + "\n" + \
+        f"page {self.index + 1} / {self.count()}" + "```"
     
-        await self.message.edit(content=msg)
+    async def edit(self, message: discord.Message):
+        """
+            Edits the Discord message
+        """
+
+        await message.edit(content=self.render())
+
+    async def delete(self, message: discord.Message):
+        """
+            Deletes the Discord message
+        """
+
+        await message.delete()
+
+class LazyPage(Page):
+    """
+        A Page whose next pages are fetched on demand
+
+        source describes the listing, fetch(source, key) returns the
+        lines of the page starting at key and the key of the following
+        page (None on the last page)
+    """
+
+    def __init__(
+            self,
+            author_id: int,
+            content: List[str],
+            source: Any,
+            key: Any
+        ):
+        super().__init__(author_id, [content])
 
-    async def delete(self):
+        self.source = source
+        self.key = key
+
+    async def move(self, n: int, fetch: Callable=None) -> bool:
         """
-            Deletes the Discord message and the object
+            Moves index of n pages, fetching the missing ones
         """
 
-        await self.message.delete()
-        del self
+        index = self.index + n
+
+        while index >= len(self.content) and self.key is not None:
+            key = self.key
+            content, next_key = await fetch(self.source, key)
+
+            # Another flip has already fetched this page
+            if self.key != key:
+                continue
+
+            self.key = next_key
+
+            if content:
+                self.content.append(content)
+
+        return self.set_index(index)
+
+    def count(self) -> str:
+        """
+            Returns the displayed page count, "+" if there is more
+        """
+
+        return str(len(self.content)) + ("+" if self.key is not None else "")
 
 class Pages(Binds):
     """
         Manages Page objects
     """
 
-    def __init__(self):
+    def __init__(self, namespace: str="pages", bot: commands.Bot=None):
         super().__init__()
 
-        self.pages = {}
+        # message id -> Page, expired and evicted with the store rules
+        self.pages = create_store(namespace, PAGES_TTL, PAGES_MAX)
         self.init()
 
+        # One persistent view for every page message of the namespace,
+        # the buttons keep working after a restart with the redis store
+        self.page_view = None
+
+        if PAGES_BACKEND == "buttons":
+            self.page_view = self.create_view(namespace)
+
+            if bot:
+                bot.add_view(self.page_view)
+
     def init(self):
         """
             Initializes binds
@@ -96,73 +185,158 @@ class Pages(Binds):
         self.add_bind(str(Reactions.NEXT), self.move_page, n=1)
         self.add_bind(str(Reactions.DELETE), self.delete_page)
     
-    def add_page(self, message: discord.Message, author_id: str, pages: List[str]) -> Page:
+    def create_view(self, namespace: str) -> object:
+        """
+            Returns a view with a button per binded emoji
+        """
+
+        view = discord.ui.View(timeout=None)
+
+        for name, v in PageReaction.__members__.items():
+            button = discord.ui.Button(
+                emoji=v.value,
+                custom_id=f"{namespace}:{name.lower()}"
+            )
+            button.callback = self.button_handler(str(v.value))
+            view.add_item(button)
+
+        return view
+
+    async def send_page(self, ctx: commands.Context, page: Page):
         """
-            Adds a Page to the dictionnary
+            Sends the page message with its buttons or reactions
+            and registers it
         """
 
-        ret = Page(message, author_id, pages)
-        self.pages[message.id] = ret
+        if self.page_view:
+            message = await ctx.send(page.render(), view=self.page_view)
+        else:
+            message = await ctx.send(page.render())
+            for _, v in PageReaction.__members__.items():
+                await message.add_reaction(v.value)
 
-        return ret
+        await self.pages.set(message.id, page)
 
     async def create_pages(self, ctx: commands.Context, pages: List[List[str]]):
         """
             Creates and sends a page message
         """
 
-        msg = "```" + '\n'.join(pages[0]) + "\n" + \
-        f"page 1 / {len(pages)}" + "```"
+        await self.send_page(ctx, Page(ctx.author.id, pages))
 
-        message = await ctx.send(msg)
-        for _, v in PageReaction.__members__.items():
-            await message.add_reaction(v.value)
+    async def create_lazy_pages(
+        self,
+        ctx: commands.Context,
+        content: List[str],
+        source: Any,
+        key: Any
+    ):
+        """
+            Creates and sends a page message, the next pages
+            are fetched with fetch_page when the user moves to them
+        """
 
-        self.add_page(message, ctx.author.id, pages)
+        await self.send_page(ctx, LazyPage(ctx.author.id, content, source, key))
 
-    def get_good_page(self, reaction: object, user: object) -> Union[Page, None]:
+    async def fetch_page(self, source: Any, key: Any) -> Tuple[List[str], Any]:
+        """
+            Method prototype, returns the lines of a LazyPage page
+            and the key of the following one
+        """
+
+        raise NotImplementedError("Not implemented")
+
+    async def get_good_page(self, reaction: object, user: object) -> Union[Page, None]:
         """
             Returns a Page if the user has clicked on a binded emoji and if it
             is his message, otherwise it returns None
         """
 
-        message_id = reaction.message.id
-
         if not str(reaction) in self.key_binding.keys():
             return None
-        if not message_id in self.pages.keys():
-            return None
 
-        page = self.pages[message_id]
+        page = await self.pages.get(reaction.message.id)
+
+        if not page:
+            return None
         if page.author_id != user.id:
             return None
 
         return page
 
-    async def move_page(self, page: Page, n: int):
+    async def move_page(
+        self,
+        page: Page,
+        message: discord.Message,
+        n: int,
+        interaction: object=None
+    ):
         """
-            Moves the page
+            Moves the page, a button click is answered
+            with the edit itself
         """
 
-        if not page.move(n):
+        if not await page.move(n, self.fetch_page):
             return
-        await page.edit()
 
-    async def delete_page(self, page: Page):
+        await self.pages.set(message.id, page)
+
+        if interaction:
+            await interaction.response.edit_message(content=page.render())
+        else:
+            await page.edit(message)
+
+    async def delete_page(
+        self,
+        page: Page,
+        message: discord.Message,
+        interaction: object=None
+    ):
         """
             Deletes the page
         """
 
-        await page.delete()
+        await self.pages.delete(message.id)
+
+        if interaction:
+            await interaction.response.defer()
+
+        await page.delete(message)
 
     async def handler(self, reaction: object, user: object):
         """
             Calls functions if needed
         """
 
-        page = self.get_good_page(reaction, user)
+        page = await self.get_good_page(reaction, user)
 
         if not page:
             return
 
-        await self.try_call_from_bind(str(reaction), page=page)
+        await self.try_call_from_bind(
+            str(reaction),
+            page=page,
+            message=reaction.message
+        )
+
+    def button_handler(self, emoji: str) -> Callable:
+        """
+            Returns the callback of the emoji button
+        """
+
+        async def callback(interaction: object):
+            page = await self.pages.get(interaction.message.id)
+
+            if page and page.author_id == interaction.user.id:
+                await self.try_call_from_bind(
+                    emoji,
+                    page=page,
+                    message=interaction.message,
+                    interaction=interaction
+                )
+
+            # Every click needs an answer, even when nothing changes
+            if not interaction.response.is_done():
+                await interaction.response.defer()
+
+        return callback
@@ -0,0 +1,32 @@
+"""rate limiter module"""
+
+import asyncio
+import time
+
+class RateLimiter:
+    """
+        Token bucket, consume(n) waits until n units are available
+        (rate units per second, up to burst units at once,
+        disabled if rate <= 0)
+    """
+
+    def __init__(self, rate: float, burst: float=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.allowance = self.burst
+        self.last = time.monotonic()
+
+    async def consume(self, n: float):
+        if self.rate <= 0:
+            return
+
+        now = time.monotonic()
+        self.allowance = min(
+            self.burst,
+            self.allowance + (now - self.last) * self.rate
+        )
+        self.last = now
+        self.allowance -= n
+
+        if self.allowance < 0:
+            await asyncio.sleep(-self.allowance / self.rate)
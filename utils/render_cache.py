@@ -0,0 +1,227 @@
+"""render cache module"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+from collections import OrderedDict
+from typing import Dict, Union
+
+log = logging.getLogger(__name__)
+
+class LRUTier:
+    """
+        A size bounded LRU index (key -> size in bytes)
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def touch(self, key: str):
+        """
+            Marks the key as recently used
+        """
+
+        self.entries.move_to_end(key)
+
+    def add(self, key: str, size: int) -> list:
+        """
+            Adds a key and returns the evicted keys
+        """
+
+        if key in self.entries:
+            self.size -= self.entries.pop(key)
+
+        self.entries[key] = size
+        self.size += size
+
+        evicted = []
+
+        while self.size > self.max_size and self.entries:
+            old_key, old_size = self.entries.popitem(last=False)
+            self.size -= old_size
+            evicted.append(old_key)
+
+        return evicted
+
+    def remove(self, key: str):
+        """
+            Removes a key if it exists
+        """
+
+        if key in self.entries:
+            self.size -= self.entries.pop(key)
+
+class RenderCache:
+    """
+        Caches rendered images, keyed by the asset checksum
+        and the normalized render parameters
+
+        It has two LRU tiers, a small one in memory
+        and a bigger one on disk (disabled if path is empty)
+    """
+
+    def __init__(self, path: str, memory_size: int, disk_size: int):
+        self.path = path
+        self.memory = LRUTier(memory_size)
+        self.memory_data = {}
+        self.disk = LRUTier(disk_size)
+
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            self.load_disk_index()
+
+    @staticmethod
+    def key(checksum: str, route: str, data: dict) -> str:
+        """
+            Builds a cache key from the asset checksum
+            and the render parameters (the asset path is ignored)
+        """
+
+        params = {
+            k: str(v).strip().lower()
+            for k, v in data.items() if k != "skin"
+        }
+        raw = checksum + route + json.dumps(params, sort_keys=True)
+
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def filename(self, key: str) -> str:
+        return os.path.join(self.path, key + ".png")
+
+    def load_disk_index(self):
+        """
+            Rebuilds the disk tier index, the least recently used first
+        """
+
+        files = []
+
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(".png"):
+                continue
+
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+
+        for _, key, size in sorted(files):
+            for evicted in self.disk.add(key, size):
+                self.remove_file(evicted)
+
+    def remove_file(self, key: str):
+        try:
+            os.remove(self.filename(key))
+        except OSError:
+            pass
+
+    def read_file(self, key: str) -> Union[bytes, None]:
+        try:
+            with open(self.filename(key), "rb") as f:
+                content = f.read()
+
+            os.utime(self.filename(key))
+        except OSError:
+            return None
+
+        return content
+
+    def write_file(self, key: str, content: bytes, evicted: list):
+        tmp = self.filename(key) + ".tmp"
+
+        with open(tmp, "wb") as f:
+            f.write(content)
+
+        os.replace(tmp, self.filename(key))
+
+        for old_key in evicted:
+            self.remove_file(old_key)
+
+    def set_memory(self, key: str, content: bytes):
+        # It would evict everything, then itself
+        if len(content) > self.memory.max_size:
+            return
+
+        for evicted in self.memory.add(key, len(content)):
+            self.memory_data.pop(evicted, None)
+
+        self.memory_data[key] = content
+
+    async def get(self, key: str) -> Union[bytes, None]:
+        """
+            Returns the cached image or None
+        """
+
+        if key in self.memory:
+            self.memory.touch(key)
+            self.hits["memory"] += 1
+
+            return self.memory_data[key]
+
+        if key in self.disk:
+            loop = asyncio.get_event_loop()
+            content = await loop.run_in_executor(None, self.read_file, key)
+
+            if content:
+                self.disk.touch(key)
+                self.set_memory(key, content)
+                self.hits["disk"] += 1
+
+                return content
+
+            self.disk.remove(key)
+
+        self.misses += 1
+
+        return None
+
+    async def set(self, key: str, content: bytes):
+        """
+            Stores an image in both tiers
+        """
+
+        self.set_memory(key, content)
+
+        if not self.path or len(content) > self.disk.max_size:
+            return
+
+        evicted = self.disk.add(key, len(content))
+        loop = asyncio.get_event_loop()
+
+        try:
+            await loop.run_in_executor(
+                None,
+                self.write_file,
+                key,
+                content,
+                evicted
+            )
+        except OSError as error:
+            self.disk.remove(key)
+            log.warning(f"Unable to write the render cache entry {key}: {error}")
+
+    def stats(self) -> Dict[str, int]:
+        """
+            Returns the cache counters
+        """
+
+        return {
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.misses,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.size,
+            "disk_entries": len(self.disk),
+            "disk_bytes": self.disk.size
+        }
@@ -0,0 +1,204 @@
+"""render scheduler module"""
+
+import asyncio
+import time
+
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable
+
+class SchedulerBusy(Exception):
+    """
+        Raised when a job can not be queued
+    """
+
+class Job:
+    """
+        A queued call waiting for a free slot
+    """
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = asyncio.get_event_loop().create_future()
+        self.submitted_at = time.monotonic()
+
+class RenderScheduler:
+    """
+        Limits the number of concurrent jobs sent to the tw-utils API
+
+        Every guild has its own queue and the queues are served
+        round-robin, so one guild can not starve the others
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        max_queue: int,
+        max_guild_queue: int
+    ):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_guild_queue = max_guild_queue
+
+        self.queues = OrderedDict()
+        self.depth = 0
+        self.running = 0
+
+        # Futures resolved when a job ends
+        self.waiters = []
+
+        self.served = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_last = 0.0
+
+    async def submit(
+        self,
+        guild_id: Hashable,
+        func: Callable,
+        *args: list,
+        **kwargs: dict
+    ) -> Any:
+        """
+            Queues the coroutine function call and returns its result,
+            raises SchedulerBusy if the queues are full
+        """
+
+        return await self.enqueue(guild_id, func, *args, **kwargs)
+
+    def enqueue(
+        self,
+        guild_id: Hashable,
+        func: Callable,
+        *args: list,
+        **kwargs: dict
+    ) -> asyncio.Future:
+        """
+            Queues the coroutine function call and returns the future
+            of its result (cancelling it drops the job if it has not
+            started), raises SchedulerBusy if the queues are full
+        """
+
+        queue = self.queues.get(guild_id)
+
+        if self.depth >= self.max_queue or \
+            (queue and len(queue) >= self.max_guild_queue):
+            self.rejected += 1
+            raise SchedulerBusy()
+
+        if queue is None:
+            queue = self.queues[guild_id] = deque()
+
+        job = Job(func, args, kwargs)
+        queue.append(job)
+        self.depth += 1
+
+        self.dispatch()
+
+        return job.future
+
+    def free(self, guild_id: Hashable) -> int:
+        """
+            Returns how many jobs the guild can queue right now
+        """
+
+        queue = self.queues.get(guild_id) or ()
+
+        return max(
+            min(
+                self.max_queue - self.depth,
+                self.max_guild_queue - len(queue)
+            ),
+            0
+        )
+
+    def wait_slot(self) -> asyncio.Future:
+        """
+            Returns a future resolved when the next job ends
+        """
+
+        waiter = asyncio.get_event_loop().create_future()
+        self.waiters.append(waiter)
+
+        return waiter
+
+    def next_job(self) -> Job:
+        """
+            Pops the next job, the guilds are served round-robin
+        """
+
+        guild_id, queue = next(iter(self.queues.items()))
+        job = queue.popleft()
+
+        if queue:
+            self.queues.move_to_end(guild_id)
+        else:
+            del self.queues[guild_id]
+
+        self.depth -= 1
+
+        return job
+
+    def dispatch(self):
+        """
+            Starts queued jobs while there are free slots
+        """
+
+        while self.running < self.concurrency and self.queues:
+            job = self.next_job()
+
+            # The caller is gone
+            if job.future.done():
+                continue
+
+            wait = time.monotonic() - job.submitted_at
+            self.served += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.wait_last = wait
+
+            self.running += 1
+            asyncio.ensure_future(self.run(job))
+
+    async def run(self, job: Job):
+        """
+            Runs a job and releases its slot
+        """
+
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+
+            if not job.future.done():
+                job.future.set_result(result)
+        except Exception as error:
+            if not job.future.done():
+                job.future.set_exception(error)
+        finally:
+            self.running -= 1
+            self.dispatch()
+
+            waiters, self.waiters = self.waiters, []
+
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+            Returns the scheduler counters (wait times in ms)
+        """
+
+        average = self.wait_total / self.served if self.served else 0
+
+        return {
+            "running": self.running,
+            "queue_depth": self.depth,
+            "queued_guilds": len(self.queues),
+            "served": self.served,
+            "rejected": self.rejected,
+            "wait_last_ms": round(self.wait_last * 1000, 1),
+            "wait_avg_ms": round(average * 1000, 1),
+            "wait_max_ms": round(self.wait_max * 1000, 1)
+        }
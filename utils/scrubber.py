@@ -0,0 +1,328 @@
+"""storage scrubber module"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+
+from typing import Dict, List, Tuple, Union
+
+from utils.image import image_hashes
+from utils.ratelimit import RateLimiter
+
+log = logging.getLogger(__name__)
+
+# Files written by utils.storage (originals and previews)
+CHECKSUM_FILE = re.compile(r"^([0-9a-f]{32})(\.preview)?\.png$")
+TMP_FILE = re.compile(r"\.tmp$")
+
+# Former checksum -> path keys (flat storage layout)
+REDIS_CHECKSUM_KEYS = "[0-9a-f]" * 32
+
+# Budget of a file deletion for the rate limiter (bytes)
+DELETE_COST = 4096
+
+# Missing or corrupt asset ids kept in the report
+REPORT_IDS = 20
+
+def list_files(root: str) -> List[Tuple[str, str, float]]:
+    """
+        Returns (path, name, mtime) for every file under root
+    """
+
+    ret = []
+
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+
+            try:
+                ret.append((path, name, os.path.getmtime(path)))
+            except FileNotFoundError:
+                continue
+
+    return ret
+
+def file_mtime(path: str) -> Union[float, None]:
+    """
+        Returns the file mtime or None if it does not exist
+    """
+
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+def read_file(path: str) -> Union[bytes, None]:
+    """
+        Returns the file content or None if it does not exist
+    """
+
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+class Scrubber:
+    """
+        Reconciles the storage directory, the asset documents and
+        the former Redis checksum keys:
+            - deletes the files and previews no document uses
+              (after a grace period)
+            - reports the documents whose file is missing or corrupt
+              (neither the uploaded nor the optimized checksum)
+            - computes the hashes the old documents do not have
+            - deletes the Redis checksum -> path keys
+
+        Every file read or deletion goes through an I/O rate limiter
+        and the database is queried in batches, the hashes are computed
+        in the image executor if one is given
+    """
+
+    def __init__(
+        self,
+        db_conn: object,
+        path: str,
+        io_rate: float,
+        batch_size: int,
+        grace: float,
+        redis: object=None,
+        executor: object=None
+    ):
+        self.db_conn = db_conn
+        self.path = path
+        self.limiter = RateLimiter(io_rate)
+        self.batch_size = batch_size
+        self.grace = grace
+        self.redis = redis
+        self.executor = executor
+
+        self.last_report = {}
+
+    async def run_io(self, func: callable, *args: list) -> object:
+        loop = asyncio.get_event_loop()
+
+        return await loop.run_in_executor(None, func, *args)
+
+    async def run_cpu(self, func: callable, *args: list) -> object:
+        if self.executor:
+            return await self.executor.run(func, *args)
+
+        return await self.run_io(func, *args)
+
+    async def remove(self, path: str):
+        await self.limiter.consume(DELETE_COST)
+
+        try:
+            await self.run_io(os.remove, path)
+        except FileNotFoundError:
+            pass
+
+    async def read(self, path: str) -> Union[bytes, None]:
+        content = await self.run_io(read_file, path)
+
+        if content:
+            await self.limiter.consume(len(content))
+
+        return content
+
+    async def check(self, doc: dict, content: Union[bytes, None]) -> str:
+        """
+            Returns the state of the document file:
+            "ok", "missing" or "corrupt"
+        """
+
+        if content is None:
+            return "missing"
+
+        # The file is either the uploaded or the optimized one
+        stored_checksum = hashlib.md5(content).hexdigest()
+
+        if stored_checksum in (doc["checksum"], doc.get("storedChecksum")):
+            return "ok"
+
+        # Uploaded again after the file was optimized, the new
+        # document is not optimized yet
+        if not doc.get("storedChecksum") and \
+            await self.db_conn.is_stored_checksum(doc["checksum"], stored_checksum):
+            return "ok"
+
+        return "corrupt"
+
+    async def run(self) -> Dict[str, object]:
+        """
+            Runs a full pass and returns its report
+        """
+
+        start = time.monotonic()
+        report = {
+            "files": 0,
+            "orphans_deleted": 0,
+            "tmp_deleted": 0,
+            "unknown_files": 0,
+            "documents": 0,
+            "missing_files": 0,
+            "corrupt_files": 0,
+            "hashes_backfilled": 0,
+            "redis_keys_deleted": 0,
+            "missing_ids": [],
+            "corrupt_ids": []
+        }
+
+        await self.scrub_files(report)
+        await self.scrub_documents(report)
+        await self.scrub_redis(report)
+
+        report["duration_s"] = round(time.monotonic() - start, 1)
+        self.last_report = report
+
+        return report
+
+    async def scrub_files(self, report: dict):
+        """
+            Deletes the files that are not used by any document
+        """
+
+        if not self.path or not os.path.isdir(self.path):
+            return
+
+        files = await self.run_io(list_files, self.path)
+        expired = time.time() - self.grace
+
+        for i in range(0, len(files), self.batch_size):
+            batch = files[i:i + self.batch_size]
+            checksums = {}
+
+            for path, name, mtime in batch:
+                report["files"] += 1
+                match = CHECKSUM_FILE.match(name)
+
+                if match:
+                    checksums[path] = (match.group(1), mtime)
+                elif TMP_FILE.search(name):
+                    if mtime < expired:
+                        await self.remove(path)
+                        report["tmp_deleted"] += 1
+                else:
+                    report["unknown_files"] += 1
+
+            if not checksums:
+                continue
+
+            used = await self.db_conn.get_existing_checksums(
+                list(set(checksum for checksum, _ in checksums.values()))
+            )
+
+            for path, (checksum, mtime) in checksums.items():
+                # A file is written before its document is inserted
+                if checksum in used or mtime >= expired:
+                    continue
+
+                # Uploaded again since the listing, it is touched
+                # before the new document is inserted
+                mtime = await self.run_io(file_mtime, path)
+
+                if mtime is None or mtime >= time.time() - self.grace:
+                    continue
+
+                await self.remove(path)
+                report["orphans_deleted"] += 1
+
+    async def scrub_documents(self, report: dict):
+        """
+            Checks the file of every document and backfills the hashes
+        """
+
+        # path -> "ok", "missing" or "corrupt" (files shared by guilds)
+        checked = {}
+
+        # path -> (pixel hash, perceptual hash)
+        hashes = {}
+
+        after = None
+
+        while True:
+            docs = await self.db_conn.scan_assets(after, self.batch_size)
+
+            if not docs:
+                break
+
+            after = docs[-1]["_id"]
+            updates = {}
+
+            for doc in docs:
+                report["documents"] += 1
+                path = doc["path"]
+                content = None
+
+                if path not in checked:
+                    content = await self.read(path)
+                    checked[path] = await self.check(doc, content)
+
+                state = checked[path]
+
+                if state != "ok":
+                    report[f"{state}_files"] += 1
+
+                    if len(report[f"{state}_ids"]) < REPORT_IDS:
+                        report[f"{state}_ids"].append(str(doc["_id"]))
+
+                    log.warning(f"Asset {doc['_id']}: {state} file {path}")
+                    continue
+
+                if doc.get("pixelHash") and doc.get("phash"):
+                    continue
+
+                if path not in hashes:
+                    content = content or await self.read(path)
+
+                    try:
+                        hashes[path] = await self.run_cpu(image_hashes, content)
+                    except Exception:
+                        log.warning(f"Asset {doc['_id']}: undecodable file {path}")
+                        continue
+
+                pixel_hash, phash = hashes[path]
+                updates[doc["_id"]] = {
+                    "pixelHash": pixel_hash,
+                    "phash": phash
+                }
+
+            if updates:
+                await self.db_conn.update_assets(updates)
+                report["hashes_backfilled"] += len(updates)
+
+    async def scrub_redis(self, report: dict):
+        """
+            Deletes the former checksum -> path keys
+        """
+
+        if not self.redis:
+            return
+
+        def delete_keys() -> int:
+            ret = 0
+            batch = []
+
+            for key in self.redis.scan_iter(
+                match=REDIS_CHECKSUM_KEYS,
+                count=self.batch_size
+            ):
+                batch.append(key)
+
+                if len(batch) >= self.batch_size:
+                    ret += self.redis.delete(*batch)
+                    batch = []
+
+            if batch:
+                ret += self.redis.delete(*batch)
+
+            return ret
+
+        try:
+            report["redis_keys_deleted"] = await self.run_io(delete_keys)
+        except Exception as error:
+            log.warning(f"Redis scrub failed: {error}")
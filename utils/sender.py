@@ -0,0 +1,104 @@
+"""batched message sender module"""
+
+import asyncio
+import discord
+import logging
+
+from typing import Awaitable, Callable, Dict, List, Tuple, Union
+
+from utils.ratelimit import RateLimiter
+
+log = logging.getLogger(__name__)
+
+# Discord allows 5 messages per 5 seconds in a channel
+CHANNEL_RATE = 1
+CHANNEL_BURST = 5
+
+# Messages per bulk delete request
+BULK_DELETE_MAX = 100
+
+class BatchSender:
+    """
+        Sends or deletes many messages: one queue per channel paced under
+        the channel rate limit, the channels are served concurrently so a
+        batch never waits on the 429 retries of discord.py
+    """
+
+    def __init__(self, rate: float=CHANNEL_RATE, burst: float=CHANNEL_BURST):
+        self.rate = rate
+        self.burst = burst
+
+        # channel id -> limiter, shared by the concurrent batches
+        self.limiters = {}
+
+    def limiter(self, channel: object) -> RateLimiter:
+        if channel.id not in self.limiters:
+            self.limiters[channel.id] = RateLimiter(self.rate, self.burst)
+
+        return self.limiters[channel.id]
+
+    async def send_all(
+        self,
+        jobs: List[Tuple[object, Callable[[], Awaitable[dict]]]]
+    ) -> List[Union[discord.Message, None]]:
+        """
+            Sends the (channel, coroutine function returning the send
+            kwargs) jobs and returns the messages in the jobs order
+            (None if a send failed)
+        """
+
+        ret = [None] * len(jobs)
+        by_channel = {}
+
+        for i, (channel, make) in enumerate(jobs):
+            by_channel.setdefault(channel, []).append((i, make))
+
+        async def drain(channel: object, items: list):
+            limiter = self.limiter(channel)
+
+            for i, make in items:
+                await limiter.consume(1)
+
+                try:
+                    ret[i] = await channel.send(**await make())
+                except (discord.HTTPException, OSError) as error:
+                    log.warning(f"Unable to send a message in {channel}: {error}")
+
+        await asyncio.gather(
+            *(drain(channel, items) for channel, items in by_channel.items())
+        )
+
+        return ret
+
+    async def delete_all(self, messages: Dict[object, List[int]]):
+        """
+            Deletes the messages (channel -> message ids), with bulk
+            deletes when Discord allows it (messages under 14 days)
+        """
+
+        async def drain(channel: object, ids: List[int]):
+            limiter = self.limiter(channel)
+            partials = [channel.get_partial_message(_id) for _id in ids]
+
+            for i in range(0, len(partials), BULK_DELETE_MAX):
+                batch = partials[i:i + BULK_DELETE_MAX]
+                await limiter.consume(1)
+
+                try:
+                    await channel.delete_messages(batch)
+                    continue
+                except discord.HTTPException:
+                    pass
+
+                # Too old for a bulk delete or already deleted
+                for message in batch:
+                    await limiter.consume(1)
+
+                    try:
+                        await message.delete()
+                    except discord.HTTPException:
+                        pass
+
+        await asyncio.gather(
+            *(drain(channel, ids) for channel, ids in messages.items())
+        )
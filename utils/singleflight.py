@@ -0,0 +1,34 @@
+"""single-flight module"""
+
+import asyncio
+
+from typing import Any, Callable, Hashable
+
+class SingleFlight:
+    """
+        Coalesces concurrent calls sharing the same key,
+        the callers wait on one in-flight call and get its result
+    """
+
+    def __init__(self):
+        self.calls = {}
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    async def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """
+            Calls the coroutine function func, unless a call
+            with the same key is already running
+        """
+
+        future = self.calls.get(key)
+
+        if not future:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self.calls[key] = future
+
+            future.add_done_callback(lambda _: self.calls.pop(key, None))
+
+        # A cancelled caller must not cancel the call for the others
+        return await asyncio.shield(future)
@@ -0,0 +1,126 @@
+"""asset storage module"""
+
+import hashlib
+import os
+import uuid
+
+from typing import Tuple, Union
+
+from utils.config import DockerConfig
+from utils.image import make_preview, optimize_png
+
+CONFIG = DockerConfig("config.ini")
+
+STORAGE_PATH = CONFIG.get_var("STORAGE", "PATH")
+
+# Bigger assets are sent as a downscaled preview (pixels)
+PREVIEW_SIZE = int(CONFIG.get_var("STORAGE", "PREVIEW_SIZE") or 512)
+
+def asset_path(checksum: str, root: str=None) -> str:
+    """
+        Returns the file path of an asset, derived from its checksum
+        with two levels of subdirectories (ab/cd/abcd....png)
+    """
+
+    root = root or STORAGE_PATH
+
+    return f"{root}/{checksum[:2]}/{checksum[2:4]}/{checksum}.png"
+
+def preview_path(checksum: str, root: str=None) -> str:
+    """
+        Returns the file path of an asset preview, next to the original
+    """
+
+    root = root or STORAGE_PATH
+
+    return f"{root}/{checksum[:2]}/{checksum[2:4]}/{checksum}.preview.png"
+
+def create_preview(
+    checksum: str,
+    path: str,
+    content: Union[bytes, None]=None
+) -> str:
+    """
+        Returns the path of the asset preview, it is generated from the
+        original (path or content) if it does not exist yet. A small asset
+        is its own preview, the original path is returned
+    """
+
+    ret = preview_path(checksum)
+
+    if os.path.exists(ret):
+        return ret
+
+    preview = make_preview(content or path, PREVIEW_SIZE)
+
+    if not preview:
+        return path
+
+    write_asset(ret, preview)
+
+    return ret
+
+def replace_file(path: str, content: bytes):
+    """
+        Writes the file through a temporary file and an atomic rename,
+        so a file is never partial
+    """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Unique, the same file can be written twice at the same time
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+
+    with open(tmp, "wb") as f:
+        f.write(content)
+
+    os.replace(tmp, path)
+
+def write_asset(path: str, content: bytes):
+    """
+        Writes the asset file if it does not exist yet
+
+        An existing file is touched, so the scrubber grace period
+        protects it until its new document is inserted
+    """
+
+    if os.path.exists(path):
+        os.utime(path)
+        return
+
+    replace_file(path, content)
+
+def optimize_asset(path: str) -> Union[Tuple[Union[bytes, None], str, int], None]:
+    """
+        Losslessly re-encodes the asset file, returns the smaller content
+        (None if it does not get smaller), the MD5 of the file to store
+        and the saved bytes (None if the file is missing or can not be
+        decoded)
+
+        The file is not written, the caller records the new checksum
+        before replacing it. The asset checksum (uploaded bytes) and
+        path do not change
+    """
+
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+
+        optimized = optimize_png(content)
+    except Exception:
+        return None
+
+    if not optimized:
+        return None, hashlib.md5(content).hexdigest(), 0
+
+    return optimized, hashlib.md5(optimized).hexdigest(), len(content) - len(optimized)
+
+def remove_asset(path: str):
+    """
+        Removes the asset file if it exists
+    """
+
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -2,10 +2,9 @@
 
 from sys import stderr
 import discord
-import os
-import pandas as pd
+import io
 
-from typing import Dict, Tuple, Any, List
+from typing import Dict, Iterable, Tuple, Any, List
 
 async def basic_message(ctx: object, msg: str, footer: str = None) -> object:
     """
@@ -49,61 +48,53 @@ def make_groups(arr: Any, size: int) -> list:
 async def send_img(
     message: discord.Message,
     name: str,
-    filename: str,
+    img: bytes,
     url: str=None
     ):
     """
-        Saving a temp image and send it to a Discord channel
+        Sends an image to a Discord channel straight from memory
     """
 
     kwargs = {
         "title": name, 
         "color": 0x000000
     }
-        
+    filename = "render.png"
+
     embed = discord.Embed(**kwargs)
-    file = discord.File(filename, filename=filename)
+    file = discord.File(io.BytesIO(img), filename=filename)
 
     embed.set_image(url="attachment://" + filename)
     await message.channel.send(embed=embed, file=file)
 
-    os.remove(filename)
-
-def format_find(documents: List[Dict], *keys: Tuple[str]) -> Dict[str, List]:
+def format_table(documents: Iterable[Dict], *keys: Tuple[str]) -> List[str]:
     """
-        Parsing / re-format mongoDB find requests result
+        Formats documents as right aligned text columns (header included),
+        in one pass over the documents
     """
 
-    ret = {}
+    widths = [len(key) for key in keys]
+    rows = [keys]
 
     for document in documents:
-        for key in keys:
-            if not key in document.keys():
-                continue
-
-            value = document[key]
+        row = [str(document.get(key, "")) for key in keys]
+        widths = [max(width, len(value)) for width, value in zip(widths, row)]
+        rows.append(row)
 
-            try:
-                ret[key].append(value)
-            except KeyError as error:
-                # print(error, file=stderr)
-                ret[key] = [value]
+    return [
+        " ".join(value.rjust(width) for value, width in zip(row, widths))
+        for row in rows
+    ]
 
-    return ret
-
-def create_asset_pages(documents: List[Dict]) -> List[List[str]]:
+def format_assets(documents: Iterable[Dict]) -> List[str]:
     """
-        Generates formatted pages for asset
+        Formats asset documents as table lines (header included)
     """
-    
-    parsed_docs = format_find(
-            documents,
-            "_id",
-            "assetName",
-            "authorName",
-            "type"
-        )
-    frame = pd.DataFrame(parsed_docs).to_string(index=False)
-    pages = make_groups(frame.split("\n"), 10)
-
-    return pages
+
+    return format_table(
+        documents,
+        "_id",
+        "assetName",
+        "authorName",
+        "type"
+    )